@@ -0,0 +1,323 @@
+import argparse
+import json
+import os
+import platform
+import random
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import BitboardSentence, neighbor_masks
+from minesweeper import GUESSES, LARGE_BOARD_CELLS, SOLVERS, Minesweeper, MinesweeperAI, Sentence, backend, generate_solvable_board, neighbor_table, play_game, play_move, solve, uncover
+
+# Board sizes, mine counts and AI difficulties of the built-in difficulties
+PRESETS = {
+    "easy": (8, 8, 8, 1),
+    "medium": (12, 12, 24, 2),
+    "hard": (16, 16, 48, 3)
+}
+
+# Solvers the game uses for each built-in difficulty
+PRESET_SOLVERS = {
+    "easy": "rules",
+    "medium": "csp",
+    "hard": "csp"
+}
+
+# Percentiles reported for the time the AI takes per call
+PERCENTILES = (50, 90, 99)
+
+
+def time_search(height, width, mines, difficulty, boards, bitboard=False):
+    """
+    Generates solvable boards from the centre of the board with fixed
+    seeds, and returns the time taken and the number of boards tried.
+    """
+    start = (height // 2, width // 2)
+    attempts = 0
+    start_time = time.perf_counter()
+    for seed in range(boards):
+        _, stats = generate_solvable_board(height, width, mines, start, seed=seed, difficulty=difficulty, bitboard=bitboard)
+        attempts += stats["attempts"]
+    return time.perf_counter() - start_time, attempts
+
+
+def time_solve(height, width, mines, difficulty, boards, bitboard=False):
+    """
+    Lets the AI play out the same random boards with fixed seeds,
+    solvable or not, and returns the time taken.
+    """
+    game_class, _ = backend(bitboard)
+    start = (height // 2, width // 2)
+    games = [
+        game_class(height=height, width=width, mines=mines, starting_position=start, rng=random.Random(seed))
+        for seed in range(boards)
+    ]
+    start_time = time.perf_counter()
+    for game in games:
+        solve(game, start, difficulty=difficulty)
+    return time.perf_counter() - start_time
+
+
+def compare_backends(boards=50):
+    """
+    Prints the time the set-based and bitboard backends take
+    to search for solvable boards and to play out random ones.
+    """
+    print(f"{'preset':<8}{'task':<8}{'sets (s)':>10}{'bitboard (s)':>14}{'speedup':>9}")
+    for name, (height, width, mines, difficulty) in PRESETS.items():
+        sets, _ = time_search(height, width, mines, difficulty, boards)
+        bits, _ = time_search(height, width, mines, difficulty, boards, bitboard=True)
+        print(f"{name:<8}{'search':<8}{sets:>10.3f}{bits:>14.3f}{sets / bits:>8.1f}x")
+
+        sets = time_solve(height, width, mines, difficulty, boards)
+        bits = time_solve(height, width, mines, difficulty, boards, bitboard=True)
+        print(f"{name:<8}{'solve':<8}{sets:>10.3f}{bits:>14.3f}{sets / bits:>8.1f}x")
+
+
+def sentence_memory(sentences=10000):
+    """
+    Returns the memory taken, in bytes, by each set-based and each
+    bitboard sentence about the cells around a cell of a Hard board.
+    """
+    height, width, _, _ = PRESETS["hard"]
+    neighbors = neighbor_table(height, width)
+    masks = neighbor_masks(height, width)
+    cells = [(n // width, n % width) for n in range(height * width)]
+
+    sizes = []
+    for make in (
+        lambda n: Sentence(neighbors[cells[n % len(cells)]], 1),
+        lambda n: BitboardSentence(masks[n % len(cells)], 1)
+    ):
+        tracemalloc.start()
+        built = [make(n) for n in range(sentences)]
+        used, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        sizes.append(used / len(built))
+    return sizes
+
+
+def time_subset_step(boards=50):
+    """
+    Plays Hard boards until the AI runs out of safe moves, and returns
+    the time taken to look for subset and overlap conclusions from
+    each sentence left in its knowledge, and the number of sentences.
+    """
+    height, width, mines, difficulty = PRESETS["hard"]
+    start = (height // 2, width // 2)
+    ais = []
+    for seed in range(boards):
+        game = Minesweeper(height=height, width=width, mines=mines, starting_position=start, rng=random.Random(seed))
+        ai = MinesweeperAI(height=height, width=width, difficulty=difficulty)
+        revealed = set()
+        move = start
+        while move is not None:
+            play_move(game, ai, move, revealed)
+            move = ai.make_safe_move()
+        ais.append(ai)
+
+    sentences = 0
+    start_time = time.perf_counter()
+    for ai in ais:
+        for sentence in ai.knowledge:
+            ai.infer_from(sentence)
+        sentences += len(ai.knowledge)
+    return time.perf_counter() - start_time, sentences
+
+
+def report_sentences(boards=50):
+    """
+    Prints the memory taken by each sentence and the speed of the
+    subset step on Hard boards.
+    """
+    sets, bits = sentence_memory()
+    print(f"memory per sentence: {sets:.0f} bytes (sets), {bits:.0f} bytes (bitboard)")
+    elapsed, sentences = time_subset_step(boards)
+    print(f"subset step: {sentences} sentences, {elapsed / max(sentences, 1) * 1e6:.1f} us per sentence")
+
+
+def compare_guessing(boards=50):
+    """
+    Prints how many of the same random boards the AI wins, playing
+    them to the end, when guessing at random and by mine probability.
+    """
+    print(f"{'preset':<8}{'random':>8}{'probability':>13}")
+    for name, (height, width, mines, difficulty) in PRESETS.items():
+        start = (height // 2, width // 2)
+        wins = {}
+        for guess in ("random", "probability"):
+            random.seed(0)
+            wins[guess] = sum(
+                play_game(Minesweeper(height=height, width=width, mines=mines, starting_position=start, rng=random.Random(seed)), start, difficulty=difficulty, solver="csp", guess=guess)
+                for seed in range(boards)
+            )
+        print(f"{name:<8}{wins['random']:>8}{wins['probability']:>13}")
+
+
+def search_board(job):
+    """
+    Searches for one solvable board, for a worker process, and returns
+    the search statistics.
+    """
+    height, width, mines, difficulty, solver, seed = job
+    _, stats = generate_solvable_board(height, width, mines, (height // 2, width // 2), seed=seed, difficulty=difficulty, solver=solver)
+    return stats
+
+
+def simulate_game(job):
+    """
+    Plays one random board to the end from its centre, for a worker
+    process, guessing whenever the AI has no safe move. Returns whether
+    the AI won, and the time in seconds each call to add_knowledge_many,
+    make_safe_move and make_random_move took.
+    """
+    height, width, mines, difficulty, solver, guess, seed = job
+    game_class, _ = backend(large=height * width >= LARGE_BOARD_CELLS)
+    start = (height // 2, width // 2)
+    game = game_class(height=height, width=width, mines=mines, starting_position=start, rng=random.Random(seed))
+    ai = MinesweeperAI(height=height, width=width, difficulty=difficulty, solver=solver, guess=guess, total_mines=mines)
+    random.seed(seed)
+
+    latencies = {"add_knowledge": [], "make_safe_move": [], "make_random_move": []}
+    revealed = set()
+    move = start
+    while move is not None and not game.is_mine(move):
+        observations = uncover(game, move, revealed)
+        start_time = time.perf_counter()
+        ai.add_knowledge_many(observations)
+        latencies["add_knowledge"].append(time.perf_counter() - start_time)
+        if len(revealed) == height * width - mines:
+            return True, latencies
+
+        start_time = time.perf_counter()
+        move = ai.make_safe_move()
+        latencies["make_safe_move"].append(time.perf_counter() - start_time)
+        if move is None:
+            start_time = time.perf_counter()
+            move = ai.make_random_move()
+            latencies["make_random_move"].append(time.perf_counter() - start_time)
+    return False, latencies
+
+
+def summarize(times):
+    """
+    Returns the number, mean, percentiles and maximum of a list of
+    times in seconds, in microseconds.
+    """
+    if not times:
+        return {"calls": 0}
+    times = sorted(times)
+    summary = {"calls": len(times), "mean_us": sum(times) / len(times) * 1e6}
+    for percentile in PERCENTILES:
+        summary[f"p{percentile}_us"] = times[round(percentile / 100 * (len(times) - 1))] * 1e6
+    summary["max_us"] = times[-1] * 1e6
+    return summary
+
+
+def run_config(executor, height, width, mines, difficulty, solver, guess, boards, games, seed):
+    """
+    Measures board generation and AI play for one board configuration,
+    spreading the boards and games over the executor's processes.
+    Returns the results as a dict.
+    """
+    start_time = time.perf_counter()
+    searches = list(executor.map(search_board, [(height, width, mines, difficulty, solver, seed + n) for n in range(boards)]))
+    search_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    played = list(executor.map(simulate_game, [(height, width, mines, difficulty, solver, guess, seed + n) for n in range(games)], chunksize=max(1, games // 64)))
+    play_time = time.perf_counter() - start_time
+
+    latencies = {}
+    for _, game_latencies in played:
+        for name, times in game_latencies.items():
+            latencies.setdefault(name, []).extend(times)
+
+    return {
+        "height": height,
+        "width": width,
+        "mines": mines,
+        "difficulty": difficulty,
+        "solver": solver,
+        "guess": guess,
+        "boards": boards,
+        "boards_per_second": boards / search_time if search_time else None,
+        "attempts_per_board": sum(stats["attempts"] for stats in searches) / boards if boards else None,
+        "moves_per_board": sum(stats["moves"] for stats in searches) / boards if boards else None,
+        "games": games,
+        "games_per_second": games / play_time if play_time else None,
+        "win_rate": sum(won for won, _ in played) / games if games else None,
+        "latency": {name: summarize(times) for name, times in latencies.items()}
+    }
+
+
+def run_suite(configs, boards=20, games=100, workers=None, seed=0, guess="probability"):
+    """
+    Runs run_config for each (name, height, width, mines, difficulty,
+    solver) configuration over a pool of worker processes, printing a
+    line for each, and returns the results with details of the run.
+    """
+    results = {
+        "python": platform.python_version(),
+        "workers": workers or os.cpu_count() or 1,
+        "seed": seed,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "configs": {}
+    }
+    print(f"{'config':<12}{'boards/s':>10}{'attempts':>10}{'win rate':>10}{'add p50/p99 (us)':>20}{'safe p99':>10}{'guess p99':>11}")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for name, height, width, mines, difficulty, solver in configs:
+            result = run_config(executor, height, width, mines, difficulty, solver, guess, boards, games, seed)
+            results["configs"][name] = result
+
+            latency = result["latency"]
+            add = latency.get("add_knowledge", {})
+            print(
+                f"{name:<12}{result['boards_per_second'] or 0:>10.1f}{result['attempts_per_board'] or 0:>10.1f}{result['win_rate'] or 0:>10.2f}"
+                f"{add.get('p50_us', 0):>10.0f}{add.get('p99_us', 0):>10.0f}"
+                f"{latency.get('make_safe_move', {}).get('p99_us', 0):>10.0f}{latency.get('make_random_move', {}).get('p99_us', 0):>11.0f}"
+            )
+    return results
+
+
+def parse_size(text):
+    """
+    Parses a custom board size given as HEIGHTxWIDTHxMINES.
+    """
+    try:
+        height, width, mines = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected HEIGHTxWIDTHxMINES, got {text}")
+    return height, width, mines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks board generation and the AI without a display.")
+    parser.add_argument("--preset", action="append", choices=sorted(PRESETS), help="built-in difficulty to run, all of them by default")
+    parser.add_argument("--size", action="append", type=parse_size, default=[], help="custom board to run, as HEIGHTxWIDTHxMINES")
+    parser.add_argument("--difficulty", type=int, default=3, help="AI difficulty for custom boards")
+    parser.add_argument("--solver", choices=SOLVERS, default="csp", help="AI solver for custom boards")
+    parser.add_argument("--guess", choices=GUESSES, default="probability", help="how the AI guesses in games")
+    parser.add_argument("--boards", type=int, default=20, help="solvable boards to generate per configuration")
+    parser.add_argument("--games", type=int, default=100, help="games to play per configuration")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, one per CPU core by default")
+    parser.add_argument("--seed", type=int, default=0, help="first seed; each board and game uses the next one")
+    parser.add_argument("--json", help="file to write the results to")
+    parser.add_argument("--compare", action="store_true", help="run the backend, guessing and sentence comparisons instead")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_backends(args.boards)
+        print()
+        compare_guessing(args.boards)
+        print()
+        report_sentences(args.boards)
+    else:
+        presets = args.preset or ([] if args.size else list(PRESETS))
+        configs = [(name, *PRESETS[name][:3], PRESETS[name][3], PRESET_SOLVERS[name]) for name in presets]
+        configs += [(f"{height}x{width}x{mines}", height, width, mines, args.difficulty, args.solver) for height, width, mines in args.size]
+        results = run_suite(configs, boards=args.boards, games=args.games, workers=args.workers, seed=args.seed, guess=args.guess)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(results, f, indent=2)
@@ -0,0 +1,387 @@
+import functools
+import random
+
+from minesweeper import OVERLAPS, SUBSETS, neighbor_table, place_mines
+
+
+@functools.lru_cache(maxsize=None)
+def neighbor_masks(height, width):
+    """
+    Returns, for each cell index, a bitmask of the cells
+    within one row and column of it, not including the cell itself.
+    """
+    neighbors = neighbor_table(height, width)
+    masks = []
+    for i in range(height):
+        for j in range(width):
+            mask = 0
+            for a, b in neighbors[(i, j)]:
+                mask |= 1 << (a * width + b)
+            masks.append(mask)
+    return masks
+
+
+@functools.lru_cache(maxsize=None)
+def edge_masks(height, width):
+    """
+    Returns bitmasks of the whole board, of every column but the first,
+    and of every column but the last.
+    """
+    full = (1 << (height * width)) - 1
+    first_column = 0
+    last_column = 0
+    for i in range(height):
+        first_column |= 1 << (i * width)
+        last_column |= 1 << (i * width + width - 1)
+    return full, full & ~first_column, full & ~last_column
+
+
+def dilate(mask, height, width):
+    """
+    Returns the bitmask of the cells in `mask` together with
+    every cell within one row and column of them.
+    """
+    full, not_first, not_last = edge_masks(height, width)
+    mask |= (mask << width) | (mask >> width)
+    mask |= ((mask << 1) & not_first) | ((mask >> 1) & not_last)
+    return mask & full
+
+
+def cells_of(mask, width):
+    """
+    Returns the list of (i, j) cells in a bitmask, in row order.
+    """
+    cells = []
+    while mask:
+        low = mask & -mask
+        cells.append(divmod(low.bit_length() - 1, width))
+        mask ^= low
+    return cells
+
+
+class BitboardMinesweeper():
+    """
+    Minesweeper game representation, with the board, the mines
+    and the mines found each stored as a bitmask with one bit per cell,
+    bit i * width + j standing for cell (i, j).
+    """
+
+    def __init__(self, height=8, width=8, mines=8, starting_position=None, rng=None, mine_positions=None):
+
+        # Set initial width and height
+        self.height = height
+        self.width = width
+        self.masks = neighbor_masks(height, width)
+
+        # Add mines randomly, unless given, e.g. a board saved from an earlier search
+        if mine_positions is None:
+            mine_positions = place_mines(height, width, mines, starting_position, rng)
+        self.board = 0
+        for i, j in mine_positions:
+            self.board |= 1 << (i * width + j)
+        self.mines = self.board
+
+        # Cells with no nearby mines, which clearing spreads through
+        self.zeros = 0
+        for n, mask in enumerate(self.masks):
+            if not self.board & mask:
+                self.zeros |= 1 << n
+        self.zeros &= ~self.board
+
+        # At first, player has found no mines
+        self.mines_found = 0
+
+    def print(self):
+        """
+        Prints a text-based representation
+        of where mines are located.
+        """
+        for i in range(self.height):
+            print("--" * self.width + "-")
+            for j in range(self.width):
+                if self.is_mine((i, j)):
+                    print("|X", end="")
+                else:
+                    print("| ", end="")
+            print("|")
+        print("--" * self.width + "-")
+
+    def is_mine(self, cell):
+        i, j = cell
+        return bool(self.board >> (i * self.width + j) & 1)
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+        i, j = cell
+        return (self.board & self.masks[i * self.width + j]).bit_count()
+
+    def reveal(self, cell, revealed=()):
+        """
+        Returns the cells uncovered by revealing a safe cell, as a dict
+        from each cell to its number of nearby mines. A cell with no
+        nearby mines also uncovers the connected area of such cells that
+        are not yet revealed, and every cell bordering it.
+        """
+        start = 1 << (cell[0] * self.width + cell[1])
+        if not start & self.zeros:
+            return {cell: self.nearby_mines(cell)}
+        closed = self.zeros
+        shown = 0
+        for i, j in revealed:
+            shown |= 1 << (i * self.width + j)
+        closed = (closed & ~shown) | start
+
+        # Grow the area one step at a time through unrevealed empty cells
+        area = start
+        while True:
+            grown = dilate(area, self.height, self.width) & closed
+            if grown == area:
+                break
+            area = grown
+        uncovered = (dilate(area, self.height, self.width) & ~shown) | start
+        return {square: self.nearby_mines(square) for square in cells_of(uncovered, self.width)}
+
+    def won(self):
+        """
+        Checks if all mines have been flagged.
+        """
+        return self.mines_found == self.mines
+
+
+class BitboardSentence():
+    """
+    Logical statement about a Minesweeper game
+    A sentence consists of a bitmask of board cells,
+    and a count of the number of those cells which are mines.
+    """
+
+    __slots__ = ("cells", "count")
+
+    def __init__(self, cells, count):
+        self.cells = cells
+        self.count = count
+
+    def __eq__(self, other):
+        if not isinstance(other, BitboardSentence):
+            return NotImplemented
+        return self.cells == other.cells and self.count == other.count
+
+    def __str__(self):
+        return f"{bin(self.cells)} = {self.count}"
+
+    def known_mines(self):
+        """
+        Returns the bitmask of all cells in self.cells known to be mines.
+        """
+        if self.cells and self.count == self.cells.bit_count():
+            return self.cells
+        return False
+
+    def known_safes(self):
+        """
+        Returns the bitmask of all cells in self.cells known to be safe.
+        """
+        if self.cells and self.count == 0:
+            return self.cells
+        return False
+
+    def mark_mine(self, mask):
+        """
+        Updates internal knowledge representation given the fact that
+        the cells in a bitmask are known to be mines.
+        """
+        self.count -= (self.cells & mask).bit_count()
+        self.cells &= ~mask
+
+    def mark_safe(self, mask):
+        """
+        Updates internal knowledge representation given the fact that
+        the cells in a bitmask are known to be safe.
+        """
+        self.cells &= ~mask
+
+
+class BitboardMinesweeperAI():
+    """
+    Minesweeper game player, with the moves made and the cells known
+    to be safe or mines each stored as a bitmask with one bit per cell.
+    It follows the same rules as MinesweeperAI, but applies them in
+    full passes over its knowledge, which integer operations keep cheap.
+    Only the "rules" solver and the "random" guess are supported, and
+    it keeps no counters, so it cannot be used for a search with ai_stats.
+    """
+
+    def __init__(self, height=8, width=8, difficulty=1, solver="rules", guess="random", total_mines=None):
+
+        if solver != "rules":
+            raise ValueError(f"solver not supported by the bitboard AI: {solver}")
+        if guess != "random":
+            raise ValueError(f"guess not supported by the bitboard AI: {guess}")
+
+        # Set initial height and width
+        self.height = height
+        self.width = width
+        self.difficulty = difficulty
+        self.masks = neighbor_masks(height, width)
+
+        # Keep track of which cells have been clicked on
+        self.moves_made = 0
+
+        # Keep track of cells known to be safe or mines
+        self.mines = 0
+        self.safes = 0
+
+        # List of sentences about the game known to be true
+        self.knowledge = []
+
+    def mark_mine(self, cell):
+        """
+        Marks a cell as a mine, and updates all knowledge
+        to mark that cell as a mine as well.
+        """
+        self.mark_mines(1 << (cell[0] * self.width + cell[1]))
+
+    def mark_safe(self, cell):
+        """
+        Marks a cell as safe, and updates all knowledge
+        to mark that cell as safe as well.
+        """
+        self.mark_safes(1 << (cell[0] * self.width + cell[1]))
+
+    def mark_mines(self, mask):
+        """
+        Marks every cell in a bitmask as a mine.
+        """
+        self.mines |= mask
+        for sentence in self.knowledge:
+            sentence.mark_mine(mask)
+
+    def mark_safes(self, mask):
+        """
+        Marks every cell in a bitmask as safe.
+        """
+        self.safes |= mask
+        for sentence in self.knowledge:
+            sentence.mark_safe(mask)
+
+    def finished(self):
+        """
+        Checks if every cell is either a move made or known to be a mine,
+        so that there are no moves left to make.
+        """
+        return (self.moves_made | self.mines).bit_count() == self.height * self.width
+
+    def add_knowledge(self, cell, count):
+        """
+        Called when the Minesweeper board tells us, for a given
+        safe cell, how many neighboring cells have mines in them.
+
+        Follows the same steps as MinesweeperAI.add_knowledge.
+        """
+        self.add_knowledge_many([(cell, count)])
+
+    def add_knowledge_many(self, observations):
+        """
+        Adds what the board told us about several safe cells at once,
+        given as (cell, count) pairs, drawing conclusions only once.
+        """
+        observations = list(observations)
+        cells = 0
+        for (i, j), _ in observations:
+            cells |= 1 << (i * self.width + j)
+        self.moves_made |= cells
+        self.mark_safes(cells)
+
+        for (i, j), count in observations:
+            # Leave out cells already known to be mines or safe
+            sentence = BitboardSentence(self.masks[i * self.width + j] & ~self.moves_made, count)
+            sentence.mark_mine(self.mines)
+            sentence.mark_safe(self.safes)
+            if sentence.cells:
+                self.knowledge.append(sentence)
+        self.infer()
+
+    def infer(self):
+        """
+        Draws conclusions from all sentences, in full passes, until
+        nothing more can be concluded with the AI's rule set.
+        """
+        while True:
+
+            # Mark cells known from single sentences
+            mine_mask = 0
+            safe_mask = 0
+            for sentence in self.knowledge:
+                is_mine = sentence.known_mines()
+                is_safe = sentence.known_safes()
+                if is_mine != False:
+                    mine_mask |= is_mine
+                elif is_safe != False:
+                    safe_mask |= is_safe
+            if mine_mask or safe_mask:
+                self.mark_mines(mine_mask)
+                self.mark_safes(safe_mask)
+                self.knowledge = [sentence for sentence in self.knowledge if sentence.cells]
+                continue
+            if self.difficulty < SUBSETS:
+                return
+
+            # Deduce new sentences from pairs of sentences sharing cells
+            append_list = []
+            for sentence in self.knowledge:
+                for other in self.knowledge:
+                    shared = sentence.cells & other.cells
+                    if not shared or sentence.cells == other.cells:
+                        continue
+                    if shared == other.cells:
+                        append_list.append(BitboardSentence(sentence.cells & ~other.cells, sentence.count - other.count))
+                    elif shared != sentence.cells and self.difficulty >= OVERLAPS:
+                        only_sentence = sentence.cells & ~other.cells
+                        if sentence.count - other.count == only_sentence.bit_count():
+                            append_list.append(BitboardSentence(only_sentence, only_sentence.bit_count()))
+                            append_list.append(BitboardSentence(other.cells & ~sentence.cells, 0))
+
+            known = {(sentence.cells, sentence.count) for sentence in self.knowledge}
+            added = False
+            for sentence in append_list:
+                if (sentence.cells, sentence.count) not in known:
+                    known.add((sentence.cells, sentence.count))
+                    self.knowledge.append(sentence)
+                    added = True
+            if not added:
+                return
+
+    def make_safe_move(self):
+        """
+        Returns a safe cell to choose on the Minesweeper board.
+        The move must be known to be safe, and not already a move
+        that has been made.
+        """
+        moves = self.safes & ~self.moves_made
+        if not moves:
+            return None
+        return divmod((moves & -moves).bit_length() - 1, self.width)
+
+    def make_random_move(self):
+        """
+        Returns a move to make on the Minesweeper board.
+        Should choose randomly among cells that:
+            1) have not already been chosen, and
+            2) are not known to be mines
+        Cells away from any move made are chosen first.
+        """
+        full, _, _ = edge_masks(self.height, self.width)
+        unknown = full & ~self.moves_made & ~self.mines
+        if not unknown:
+            return None
+
+        interior = unknown & ~dilate(self.moves_made, self.height, self.width)
+        if interior:
+            return divmod((interior & -interior).bit_length() - 1, self.width)
+
+        spare = cells_of(unknown, self.width)
+        return spare[random.randrange(len(spare))]
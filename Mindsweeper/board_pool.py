@@ -0,0 +1,341 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from minesweeper import Minesweeper, generate_solvable_board, neighbor_table, solve
+
+
+def symmetries(height, width):
+    """
+    Returns the functions mapping a cell to its image under each
+    reflection and rotation of a board of the given size, starting
+    with the identity.
+    """
+    transforms = [
+        lambda i, j: (i, j),
+        lambda i, j: (height - 1 - i, j),
+        lambda i, j: (i, width - 1 - j),
+        lambda i, j: (height - 1 - i, width - 1 - j)
+    ]
+
+    # Square boards can also be transposed and turned a quarter
+    if height == width:
+        transforms += [
+            lambda i, j: (j, i),
+            lambda i, j: (width - 1 - j, height - 1 - i),
+            lambda i, j: (j, height - 1 - i),
+            lambda i, j: (width - 1 - j, i)
+        ]
+    return transforms
+
+
+# Version of the cache file, raised whenever its layout or the AI's rules
+# change, as boards are only known to be solvable under the rules they
+# were searched with; boards saved under another version are dropped
+CACHE_VERSION = 1
+
+
+# Event set when the pool stops, in its worker process
+_cancel = None
+
+
+def _init_worker(cancel):
+    """
+    Runs in the pool's worker process when it starts, keeping the event
+    that stops the search in progress.
+    """
+    global _cancel
+    _cancel = cancel
+
+
+def _search_job(height, width, mines, start, difficulty, solver):
+    """
+    Runs generate_boards in the pool's worker process, stopping early once the pool stops.
+    """
+    return generate_boards(height, width, mines, start, difficulty, solver, cancel=_cancel)
+
+
+def generate_boards(height, width, mines, start, difficulty=1, solver="rules", cancel=None):
+    """
+    Searches for a solvable board from the starting cell and returns it
+    together with those of its reflections and rotations that the AI can
+    also solve, as a list of (starting position, mine positions) pairs.
+    If `cancel` is set during the search, no boards are returned.
+    """
+    game, _ = generate_solvable_board(height, width, mines, start, difficulty=difficulty, solver=solver, cancel=cancel)
+    if game is None:
+        return []
+
+    boards = []
+    for n, transform in enumerate(symmetries(height, width)):
+        moved_start = transform(*start)
+        moved_mines = sorted(transform(*mine) for mine in game.mines)
+        if (moved_start, moved_mines) in boards:
+            continue
+
+        # The AI's rules need not treat a mirrored board the same way
+        if n > 0:
+            moved_game = Minesweeper(height=height, width=width, mine_positions=moved_mines)
+            if not solve(moved_game, moved_start, difficulty=difficulty, solver=solver)[0]:
+                continue
+        boards.append((moved_start, moved_mines))
+    return boards
+
+
+def parse_entry(entry):
+    """
+    Returns the key and boards of an entry read from the cache file,
+    or raises ValueError if the entry is not laid out as saved, or holds
+    a board that could not have been searched for its key: one with
+    another number of mines, or a mine on or next to the starting cell.
+    """
+    try:
+        height, width, mines, start, difficulty, solver = entry["key"]
+        i, j = start
+        key = (int(height), int(width), int(mines), (int(i), int(j)), int(difficulty), str(solver))
+        boards = [
+            (float(created), [(int(a), int(b)) for a, b in mine_positions])
+            for created, mine_positions in entry["boards"]
+        ]
+    except (KeyError, TypeError, ValueError) as error:
+        raise ValueError(f"malformed cache entry: {entry!r}") from error
+
+    height, width, mines, start = key[:4]
+    if not (0 <= start[0] < height and 0 <= start[1] < width):
+        raise ValueError(f"starting cell off the board in cache entry: {entry!r}")
+    opening = {start, *neighbor_table(height, width)[start]}
+    for _, mine_positions in boards:
+        if len(set(mine_positions)) != len(mine_positions) or len(mine_positions) != mines:
+            raise ValueError(f"wrong number of mines in cache entry: {entry!r}")
+        if not all(0 <= a < height and 0 <= b < width for a, b in mine_positions):
+            raise ValueError(f"mine off the board in cache entry: {entry!r}")
+        if opening.intersection(mine_positions):
+            raise ValueError(f"mine around the starting cell in cache entry: {entry!r}")
+    return key, boards
+
+
+class BoardPool():
+    """
+    Pool of ready-made solvable boards, keyed by
+    (height, width, mines, starting_position, difficulty, solver).
+
+    A background thread keeps every starting position of the wanted
+    configurations stocked, running the searches in a worker process.
+    Boards are saved to a cache file between runs, and evicted once
+    older than `max_age` seconds or, least recently used first, once
+    the pool holds more than `max_boards` of them.
+    """
+
+    def __init__(self, path="board_pool.json", per_key=1, max_boards=2000, max_age=7 * 24 * 60 * 60):
+
+        self.path = path
+        self.per_key = per_key
+        self.max_boards = max_boards
+        self.max_age = max_age
+
+        # Boards for each key as (creation time, mines) pairs, least recently used key first
+        self.boards = OrderedDict()
+        self.size = 0
+
+        # Configurations to keep stocked, most recently wanted first
+        self.wanted = []
+
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.executor = None
+        self.cancel = None
+
+        self.load()
+
+    def take(self, height, width, mines, starting_position, difficulty=1, solver="rules"):
+        """
+        Removes a board from the pool and returns it as a Minesweeper
+        game, or returns None if there is no board for this key.
+        """
+        key = (height, width, mines, tuple(starting_position), difficulty, solver)
+        with self.lock:
+            self.expire()
+            if not self.boards.get(key):
+                return None
+            self.boards.move_to_end(key)
+            _, mine_positions = self.boards[key].pop(0)
+            self.size -= 1
+
+        # Let the background thread replace the board
+        self.wake.set()
+        return Minesweeper(height=height, width=width, mines=mines, mine_positions=mine_positions)
+
+    def put(self, key, mine_positions, created=None):
+        """
+        Adds a board to the pool, evicting old boards if it is full.
+        """
+        if created is None:
+            created = time.time()
+        with self.lock:
+            self.boards.setdefault(key, []).append((created, [tuple(mine) for mine in mine_positions]))
+            self.boards.move_to_end(key)
+            self.size += 1
+            self.evict()
+
+    def count(self, height, width, mines, starting_position, difficulty=1, solver="rules"):
+        """
+        Returns the number of boards held for a key.
+        """
+        with self.lock:
+            return len(self.boards.get((height, width, mines, tuple(starting_position), difficulty, solver), ()))
+
+    def want(self, height, width, mines, difficulty=1, solver="rules"):
+        """
+        Asks the background thread to stock boards for every starting
+        position of a configuration, ahead of any configuration wanted
+        before it.
+        """
+        config = (height, width, mines, difficulty, solver)
+        with self.lock:
+            if config in self.wanted:
+                self.wanted.remove(config)
+            self.wanted.insert(0, config)
+        self.wake.set()
+
+    def expire(self):
+        """
+        Drops boards older than max_age. Expects the lock to be held.
+        """
+        oldest = time.time() - self.max_age
+        for key in list(self.boards):
+            fresh = [board for board in self.boards[key] if board[0] >= oldest]
+            self.size -= len(self.boards[key]) - len(fresh)
+            if fresh:
+                self.boards[key] = fresh
+            else:
+                del self.boards[key]
+
+    def evict(self):
+        """
+        Drops the oldest boards of the least recently used keys until the
+        pool is within max_boards. Expects the lock to be held.
+        """
+        while self.size > self.max_boards:
+            key = next(iter(self.boards))
+            self.boards[key].pop(0)
+            self.size -= 1
+            if not self.boards[key]:
+                del self.boards[key]
+
+    def next_job(self):
+        """
+        Returns the configuration and starting position of the next
+        board to search for, or None if everything wanted is stocked.
+        """
+        with self.lock:
+            for height, width, mines, difficulty, solver in self.wanted:
+                for start in [(i, j) for i in range(height) for j in range(width)]:
+                    if len(self.boards.get((height, width, mines, start, difficulty, solver), ())) < self.per_key:
+                        return (height, width, mines, difficulty, solver), start
+        return None
+
+    def refill(self):
+        """
+        Background thread body: searches for boards until stopped.
+        """
+        while not self.stopping.is_set():
+            self.wake.clear()
+            job = self.next_job()
+            if job is None:
+                self.wake.wait()
+                continue
+
+            (height, width, mines, difficulty, solver), start = job
+            try:
+                boards = self.executor.submit(_search_job, height, width, mines, start, difficulty, solver).result()
+            except Exception:
+                # The executor was shut down, or the worker process died
+                break
+
+            # Once stopping, the pool may already have been saved
+            if self.stopping.is_set():
+                break
+            for moved_start, mine_positions in boards:
+                key = (height, width, mines, moved_start, difficulty, solver)
+                if self.count(*key) < self.per_key:
+                    self.put(key, mine_positions)
+
+    def start(self):
+        """
+        Starts the background thread and its worker process.
+        """
+        if self.thread is not None:
+            return
+        self.stopping.clear()
+        self.cancel = multiprocessing.Event()
+        self.executor = ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(self.cancel,))
+        self.thread = threading.Thread(target=self.refill, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=1):
+        """
+        Stops the background thread, dropping any search in progress,
+        and saves the pool to its cache file. Waits up to `timeout`
+        seconds for the thread to finish first, so that it adds no
+        boards after the pool is saved.
+        """
+        if self.thread is not None:
+            self.stopping.set()
+            self.cancel.set()
+            self.wake.set()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.thread.join(timeout)
+            self.thread = None
+            self.executor = None
+            self.cancel = None
+        self.save()
+
+    def load(self):
+        """
+        Reads the pool from its cache file, if there is one. A file from
+        another CACHE_VERSION is ignored, as are entries that are not
+        laid out as saved.
+        """
+        if self.path is None or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                contents = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(contents, dict) or contents.get("version") != CACHE_VERSION or not isinstance(contents.get("entries"), list):
+            return
+
+        with self.lock:
+            for entry in contents["entries"]:
+                try:
+                    key, boards = parse_entry(entry)
+                except ValueError:
+                    continue
+                self.boards.setdefault(key, []).extend(boards)
+                self.size += len(boards)
+            self.expire()
+            self.evict()
+
+    def save(self):
+        """
+        Writes the pool to its cache file.
+        """
+        if self.path is None:
+            return
+        with self.lock:
+            entries = [
+                {"key": [height, width, mines, list(start), difficulty, solver], "boards": boards}
+                for (height, width, mines, start, difficulty, solver), boards in self.boards.items()
+            ]
+        try:
+            with open(self.path, "w") as f:
+                json.dump({"version": CACHE_VERSION, "entries": entries}, f)
+        except OSError:
+            pass
@@ -0,0 +1,104 @@
+import collections
+import multiprocessing
+import queue
+import threading
+import time
+
+from minesweeper import generate_solvable_board, generate_solvable_board_parallel
+
+# Seconds to search on the thread alone before starting worker processes,
+# as most boards are found in a few tries, far quicker than processes start
+SERIAL_SECONDS = 0.25
+
+
+def combine_stats(first, second):
+    """
+    Returns the statistics of two searches run one after the other,
+    as those of a single search.
+    """
+    stats = dict(second)
+    for key in ("attempts", "elapsed", "moves"):
+        stats[key] = first[key] + second[key]
+    if "ai" in first:
+        counters = collections.Counter(first["ai"])
+        counters.update(second["ai"])
+        stats["ai"] = dict(counters)
+    return stats
+
+
+class BoardSearch():
+    """
+    Search for a solvable board from a starting cell, run on a background
+    thread so that the game keeps drawing frames and handling input.
+
+    The thread searches on its own for SERIAL_SECONDS, and only then
+    races worker processes. It only ever hands its result over through a
+    queue, which the game polls with result(); progress() reports the
+    boards tried so far, counted by the thread or the worker processes in
+    a shared value, and cancel() stops the search at the next board any
+    of them starts.
+    """
+
+    def __init__(self, height, width, mines, start, difficulty=1, solver="rules", ai_stats=False):
+
+        self.height = height
+        self.width = width
+        self.mines = mines
+        self.start = start
+        self.difficulty = difficulty
+        self.solver = solver
+        self.ai_stats = ai_stats
+
+        self.attempts = multiprocessing.Value("i", 0)
+        self.cancelled = threading.Event()
+        self.results = queue.Queue(maxsize=1)
+        self.start_time = time.time()
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """
+        Background thread body: runs the search and posts its result,
+        even if the search failed.
+        """
+        result = (None, None)
+        try:
+            board, stats = generate_solvable_board(
+                self.height, self.width, self.mines, self.start,
+                difficulty=self.difficulty, solver=self.solver, ai_stats=self.ai_stats,
+                cancel=self.cancelled, progress=self.attempts, timeout=SERIAL_SECONDS
+            )
+            if board is None and not self.cancelled.is_set():
+                board, parallel_stats = generate_solvable_board_parallel(
+                    self.height, self.width, self.mines, self.start,
+                    difficulty=self.difficulty, solver=self.solver, ai_stats=self.ai_stats,
+                    cancel=self.cancelled, progress=self.attempts
+                )
+                stats = combine_stats(stats, parallel_stats)
+            result = (board, stats)
+        finally:
+            self.results.put(result)
+
+    def result(self):
+        """
+        Returns the found board and its search statistics, or None if
+        the search is still running. The board is None if the search
+        was cancelled or failed.
+        """
+        try:
+            return self.results.get_nowait()
+        except queue.Empty:
+            return None
+
+    def progress(self):
+        """
+        Returns the number of boards tried so far, and the seconds since the search started.
+        """
+        return self.attempts.value, time.time() - self.start_time
+
+    def cancel(self):
+        """
+        Stops the search. Its result, if it still posts one, can be ignored.
+        """
+        self.cancelled.set()
@@ -1,6 +1,143 @@
+import collections
+import copy
+import functools
 import itertools
+import math
+import multiprocessing
+import os
+import pickle
+import queue
 import random
-import copy
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Boards with at least this many cells are played in large-board mode
+LARGE_BOARD_CELLS = 1 << 16
+
+# Rule sets the AI may use, chosen by its difficulty: each also uses the ones before it
+SINGLE_SENTENCES = 1  # A sentence whose cells are all mines or all safe
+SUBSETS = 2  # A sentence within another leaves a sentence about the cells outside it
+OVERLAPS = 3  # Two overlapping sentences whose counts force the cells outside the overlap
+
+# Solvers the AI may use once its rules give no safe move, each also using
+# the ones before it: none, bounds on the row-reduced sentences taken as
+# linear equations, or an exact search over each group of linked cells
+SOLVERS = ("rules", "linear", "csp")
+
+# Largest group of cells the exact search will try every assignment of
+CSP_MAX_CELLS = 40
+
+# Ways the AI may guess when it has no safe move: a random cell, preferring
+# cells away from any move made, or the cell least likely to be a mine
+GUESSES = ("random", "probability")
+
+# Largest group of cells whose placements of mines are all counted
+# for mine probabilities, as there may be far more of them to count
+PROBABILITY_MAX_CELLS = 30
+
+
+def place_mines(height, width, mines, starting_position, rng=None):
+    """
+    Returns a set of randomly chosen mine positions, none of which
+    are within one row and column of the starting position.
+    """
+
+    # Use the shared random module unless a seeded generator is given
+    if rng is None:
+        rng = random
+
+    # Cells are numbered row by row, and the ones around the start are left out
+    excluded = sorted(i * width + j for i, j in (starting_position,) + neighbor_table(height, width)[starting_position])
+
+    # Skip past the left out cells, most of which come before or after all of them
+    last = excluded[-1] - len(excluded)
+    placed = set()
+    for n in rng.sample(range(height * width - len(excluded)), mines):
+        if n > last:
+            n += len(excluded)
+        else:
+            for square in excluded:
+                if n < square:
+                    break
+                n += 1
+        placed.add(divmod(n, width))
+    return placed
+
+
+class NeighborTable(dict):
+    """
+    Dict mapping each cell of a board to the tuple of cells
+    within one row and column of it, not including the cell itself.
+    Entries are worked out the first time they are looked up.
+    """
+
+    def __init__(self, height, width):
+        self.height = height
+        self.width = width
+
+    def __missing__(self, cell):
+        i, j = cell
+        if 0 < i < self.height - 1 and 0 < j < self.width - 1:
+            neighbors = (
+                (i - 1, j - 1), (i - 1, j), (i - 1, j + 1),
+                (i, j - 1), (i, j + 1),
+                (i + 1, j - 1), (i + 1, j), (i + 1, j + 1)
+            )
+        else:
+            neighbors = tuple(
+                (a, b)
+                for a in range(max(i - 1, 0), min(i + 2, self.height))
+                for b in range(max(j - 1, 0), min(j + 2, self.width))
+                if (a, b) != (i, j)
+            )
+        self[cell] = neighbors
+        return neighbors
+
+
+@functools.lru_cache(maxsize=None)
+def neighbor_table(height, width):
+    """
+    Returns the neighbor table for a board of the given size.
+
+    Tables are shared by every game and AI of that size, so they
+    must not be modified, and only hold the cells looked up so far.
+    """
+    return NeighborTable(height, width)
+
+
+def count_grid(board):
+    """
+    Returns a grid holding, for every cell of a board of booleans,
+    the number of mines within one row and column of the cell,
+    not including the cell itself.
+    """
+    height = len(board)
+    width = len(board[0]) if height else 0
+
+    # Add up the board shifted in each of the eight directions
+    if np is not None:
+        padded = np.zeros((height + 2, width + 2), dtype=np.int8)
+        padded[1:-1, 1:-1] = board
+        counts = np.zeros((height, width), dtype=np.int8)
+        for di in range(3):
+            for dj in range(3):
+                if (di, dj) != (1, 1):
+                    counts += padded[di:di + height, dj:dj + width]
+        return counts.tolist()
+
+    # Otherwise count each mine towards the cells around it
+    neighbors = neighbor_table(height, width)
+    counts = [[0] * width for _ in range(height)]
+    for i in range(height):
+        for j in range(width):
+            if board[i][j]:
+                for a, b in neighbors[(i, j)]:
+                    counts[a][b] += 1
+    return counts
 
 
 class Minesweeper():
@@ -8,11 +145,12 @@ class Minesweeper():
     Minesweeper game representation
     """
 
-    def __init__(self, height=8, width=8, mines=8, starting_position=None):
+    def __init__(self, height=8, width=8, mines=8, starting_position=None, rng=None, mine_positions=None):
 
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
+        self.neighbors = neighbor_table(height, width)
         self.mines = set()
 
         # Initialize an empty field with no mines
@@ -23,19 +161,19 @@ class Minesweeper():
                 row.append(False)
             self.board.append(row)
 
-        # Add mines randomly
-        available_squares = [(x, y) for x in range(height) for y in range(width)]
-        available_squares.remove(starting_position)
-        for i in [x for x in range(starting_position[0] - 1, starting_position[0] + 2) if 0 <= x < height]:
-            for j in [y for y in range(starting_position[1] - 1, starting_position[1] + 2) if 0 <= y < width]:
-                if (i, j) != starting_position:
-                    available_squares.remove((i, j))
-        while len(self.mines) != mines:
-            available_count = len(available_squares)
-            i, j = available_squares[random.randrange(available_count)]
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Add mines randomly, unless given, e.g. a board saved from an earlier search
+        if mine_positions is None:
+            mine_positions = place_mines(height, width, mines, starting_position, rng)
+        for i, j in mine_positions:
+            self.mines.add((i, j))
+            self.board[i][j] = True
+
+        # The board never changes, so count the mines around each cell once
+        self.counts = count_grid(self.board)
+
+        # Nor do the areas that revealing an empty cell uncovers, so each is
+        # walked the first time one of its cells is revealed and kept
+        self.regions = {}
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -48,7 +186,7 @@ class Minesweeper():
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if self.is_mine((i, j)):
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -65,24 +203,42 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
+        i, j = cell
+        return self.counts[i][j]
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
+    def region(self, cell):
+        """
+        Returns the cells uncovered by revealing a cell with no nearby
+        mines, as a dict from each cell to its number of nearby mines:
+        the connected area of such cells it is in, and every cell
+        bordering it. Each area is walked the first time one of its
+        cells is revealed, and kept for all of them.
+        """
+        if cell not in self.regions:
+            region = {cell: 0}
+            unvisited = [cell]
+            while unvisited:
+                for neighbor in self.neighbors[unvisited.pop()]:
+                    if neighbor not in region:
+                        region[neighbor] = self.nearby_mines(neighbor)
+                        if region[neighbor] == 0:
+                            unvisited.append(neighbor)
+            for square, count in region.items():
+                if count == 0:
+                    self.regions[square] = region
+        return self.regions[cell]
 
-        return count
+    def reveal(self, cell, revealed=()):
+        """
+        Returns the cells uncovered by revealing a safe cell, as a dict
+        from each cell to its number of nearby mines. A cell with no
+        nearby mines also uncovers the connected area of such cells, and
+        every cell bordering it, leaving out cells already revealed.
+        """
+        count = self.nearby_mines(cell)
+        if count != 0:
+            return {cell: count}
+        return {square: count for square, count in self.region(cell).items() if square == cell or square not in revealed}
 
     def won(self):
         """
@@ -91,22 +247,77 @@ class Minesweeper():
         return self.mines_found == self.mines
 
 
+class LargeMinesweeper(Minesweeper):
+    """
+    Minesweeper game representation for very large boards
+
+    Only the mines and the counts of cells next to them are stored,
+    so memory and set-up time grow with the number of mines rather
+    than with the area of the board. There is no `board` grid.
+    """
+
+    def __init__(self, height=8, width=8, mines=8, starting_position=None, rng=None, mine_positions=None):
+
+        # Set initial width, height, and number of mines
+        self.height = height
+        self.width = width
+        self.neighbors = neighbor_table(height, width)
+        self.board = None
+
+        # Add mines randomly, unless given, e.g. a board saved from an earlier search
+        if mine_positions is None:
+            mine_positions = place_mines(height, width, mines, starting_position, rng)
+        self.mines = set(mine_positions)
+
+        # Count each mine towards the cells around it, leaving out cells with no nearby mines
+        self.counts = collections.Counter(neighbor for mine in self.mines for neighbor in self.neighbors[mine])
+
+        # Areas uncovered by revealing empty cells, found as they are first revealed
+        self.regions = {}
+
+        # At first, player has found no mines
+        self.mines_found = set()
+
+    def is_mine(self, cell):
+        return cell in self.mines
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+        return self.counts.get(cell, 0)
+
+
 class Sentence():
     """
     Logical statement about a Minesweeper game
     A sentence consists of a set of board cells,
     and a count of the number of those cells which are mines.
+
+    Sentences are immutable, so that equal sentences hash alike
+    and the AI can keep its knowledge in a set. The hash is worked
+    out once, and slots keep each sentence small.
     """
 
+    __slots__ = ("cells", "count", "_hash")
+
     def __init__(self, cells, count):
-        self.cells = set(cells)
+        self.cells = frozenset(cells)
         self.count = count
+        self._hash = hash((self.cells, count))
 
     def __eq__(self, other):
-        return self.cells == other.cells and self.count == other.count
+        if not isinstance(other, Sentence):
+            return NotImplemented
+        return self._hash == other._hash and self.count == other.count and self.cells == other.cells
+
+    def __hash__(self):
+        return self._hash
 
     def __str__(self):
-        return f"{self.cells} = {self.count}"
+        return f"{set(self.cells)} = {self.count}"
 
     def known_mines(self):
         """
@@ -130,35 +341,228 @@ class Sentence():
 
     def mark_mine(self, cell):
         """
-        Updates internal knowledge representation given the fact that
+        Returns the sentence that remains given the fact that
         a cell is known to be a mine.
         """
 
         if cell in self.cells:
-            self.cells.remove(cell)
-            self.count -= 1
+            return Sentence(self.cells - {cell}, self.count - 1)
+        return self
 
     def mark_safe(self, cell):
         """
-        Updates internal knowledge representation given the fact that
+        Returns the sentence that remains given the fact that
         a cell is known to be safe.
         """
 
         if cell in self.cells:
-            self.cells.remove(cell)
+            return Sentence(self.cells - {cell}, self.count)
+        return self
+
+
+class Component():
+    """
+    Group of cells linked by shared sentences, together with those
+    sentences, for searching the ways of placing mines in its cells.
+
+    Placements are built one cell at a time, and a partial placement is
+    dropped as soon as a sentence can no longer be met. If `cancel` is
+    given, it is an event checked at each cell decided; once it is set,
+    the searches stop early and find nothing.
+    """
+
+    def __init__(self, sentences, cancel=None):
+
+        self.cancel = cancel
+
+        # Walk the cells through shared sentences, so that the cells
+        # of a sentence are decided close together
+        sentences_of = {}
+        for sentence in sentences:
+            for cell in sentence.cells:
+                sentences_of.setdefault(cell, []).append(sentence)
+        self.cells = []
+        placed = set()
+        for cell in sentences_of:
+            if cell in placed:
+                continue
+            placed.add(cell)
+            unvisited = collections.deque([cell])
+            while unvisited:
+                cell = unvisited.popleft()
+                self.cells.append(cell)
+                for sentence in sentences_of[cell]:
+                    for other in sentence.cells:
+                        if other not in placed:
+                            placed.add(other)
+                            unvisited.append(other)
+
+        # Sentences of each cell, and for each sentence the mines still
+        # to place and the cells still undecided
+        position = {cell: n for n, cell in enumerate(self.cells)}
+        self.constraints = [[] for _ in self.cells]
+        for k, sentence in enumerate(sentences):
+            for cell in sentence.cells:
+                self.constraints[position[cell]].append(k)
+        self.need = [sentence.count for sentence in sentences]
+        self.left = [len(sentence.cells) for sentence in sentences]
+
+    def place(self, n, value):
+        """
+        Decides the n-th cell, a mine if value is 1, and returns
+        whether every sentence can still be met.
+        """
+        fits = True
+        for k in self.constraints[n]:
+            self.need[k] -= value
+            self.left[k] -= 1
+            if self.need[k] < 0 or self.need[k] > self.left[k]:
+                fits = False
+        return fits
+
+    def unplace(self, n, value):
+        """
+        Undoes deciding the n-th cell.
+        """
+        for k in self.constraints[n]:
+            self.need[k] += value
+            self.left[k] += 1
+
+    def cancelled(self):
+        """
+        Checks if the search has been asked to stop early.
+        """
+        return self.cancel is not None and self.cancel.is_set()
+
+    def find(self, fixed):
+        """
+        Returns a placement, as a list of 0 or 1 for each cell, with the
+        cells in `fixed` given the values it maps their positions to,
+        or None if no placement fits.
+        """
+        chosen = [0] * len(self.cells)
+
+        def search(n):
+            if self.cancelled():
+                return False
+            if n == len(self.cells):
+                return True
+            for value in ((fixed[n],) if n in fixed else (0, 1)):
+                found = self.place(n, value) and search(n + 1)
+                self.unplace(n, value)
+                if found:
+                    chosen[n] = value
+                    return True
+            return False
+
+        return chosen if search(0) else None
+
+    def forced(self):
+        """
+        Returns the cells that are mines in every placement, and
+        those that are safe in every placement.
+
+        Each placement found shows cells that can be mines and cells
+        that can be safe, so only cells not yet seen both ways need a
+        search of their own, for a placement with their other value.
+        Returns no cells if the search was stopped early.
+        """
+        seen = [set() for _ in self.cells]
+        for n in [None] + list(range(len(self.cells))):
+            if n is not None:
+                if len(seen[n]) == 2:
+                    continue
+                if not seen[n]:
+                    # No placement fits at all, which only a wrong flag can cause
+                    return [], []
+                chosen = self.find({n: 1 - next(iter(seen[n]))})
+            else:
+                chosen = self.find({})
+            if self.cancelled():
+                return [], []
+            if chosen is not None:
+                for k, value in enumerate(chosen):
+                    seen[k].add(value)
+
+        mines = [cell for n, cell in enumerate(self.cells) if seen[n] == {1}]
+        safes = [cell for n, cell in enumerate(self.cells) if seen[n] == {0}]
+        return mines, safes
+
+    def count(self):
+        """
+        Counts every placement, and returns a dict from each number of
+        mines to the number of placements with that many mines and, for
+        each cell, the number of those in which it is a mine.
+        Returns None if the count was stopped early.
+        """
+        totals = {}
+        mined = []
+
+        def search(n):
+            if self.cancelled():
+                return
+            if n == len(self.cells):
+                entry = totals.setdefault(len(mined), [0, [0] * len(self.cells)])
+                entry[0] += 1
+                for k in mined:
+                    entry[1][k] += 1
+                return
+            for value in (0, 1):
+                if self.place(n, value):
+                    if value:
+                        mined.append(n)
+                    search(n + 1)
+                    if value:
+                        mined.pop()
+                self.unplace(n, value)
+
+        search(0)
+        if self.cancelled():
+            return None
+        return {mines: (solutions, dict(zip(self.cells, mine_counts))) for mines, (solutions, mine_counts) in totals.items()}
 
 
 class MinesweeperAI():
     """
     Minesweeper game player
+
+    The difficulty selects the rule set the AI reasons with:
+    SINGLE_SENTENCES, SUBSETS or OVERLAPS. Whenever its rules leave it
+    without a safe move, the "linear" solver row-reduces its sentences
+    as a system of linear equations to find more mines and safes, and
+    the "csp" solver goes on to search for cells that are mines or safe
+    in every way of placing mines that fits its knowledge.
+
+    The guess selects how it picks a move when it has none it knows to
+    be safe, see GUESSES. Knowing the total number of mines on the board
+    makes its mine probabilities exact.
+
+    While `counting` is set, the AI counts what it does and times the
+    steps of taking in knowledge in `counters`, see stats.
+
+    `version` goes up whenever the AI is told something about the board,
+    so a move worked out for one version, e.g. on a snapshot of the AI,
+    holds until the version changes. While `cancel` is an event that is
+    set, the solvers and probability counts stop early, even part way
+    through a group of cells, and leave their work unfinished, for a
+    snapshot whose move is no longer wanted.
     """
 
-    def __init__(self, height=8, width=8, difficulty=1):
+    def __init__(self, height=8, width=8, difficulty=1, solver="rules", guess="random", total_mines=None):
+
+        if solver not in SOLVERS:
+            raise ValueError(f"unknown solver: {solver}")
+        if guess not in GUESSES:
+            raise ValueError(f"unknown guess: {guess}")
 
         # Set initial height and width
         self.height = height
         self.width = width
         self.difficulty = difficulty
+        self.solver = solver
+        self.guess = guess
+        self.total_mines = total_mines
+        self.neighbors = neighbor_table(height, width)
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
@@ -167,8 +571,142 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Set of sentences about the game known to be true
+        self.knowledge = set()
+
+        # Sentences mentioning each cell, so marking a cell only touches those
+        self.index = {}
+
+        # Cells that are moves made, known to be mines or safe, or mentioned
+        # by a sentence, which stay so; the other cells are unconstrained
+        self.touched = set()
+
+        # Sentences that changed since the AI last drew conclusions from them
+        self.worklist = collections.deque()
+        self.queued = set()
+
+        # Placement counts of the groups of linked cells, by their sentences
+        self.component_counts = {}
+
+        # Safe cells not yet chosen, in the order they were found, which
+        # may still hold cells chosen since; they are dropped when reached
+        self.pending = collections.deque()
+
+        # Cells next to a move made that are neither moves nor known mines,
+        # with the position of each in the list, for random choices
+        self.frontier = []
+        self.frontier_positions = {}
+
+        # Cells before this one in row order are all next to a move made,
+        # or are moves or known mines, and so stay that way
+        self.cursor = 0
+
+        # Counts of what the AI does and seconds spent, kept only while counting
+        self.counting = False
+        self.counters = collections.Counter()
+
+        # Times the AI has been told something, and an event to stop searches early
+        self.version = 0
+        self.cancel = None
+
+    def snapshot(self):
+        """
+        Returns a copy of the AI that can go on on its own, e.g. to work
+        out a move on another thread. Sentences never change once made,
+        so the copy shares them.
+        """
+        other = copy.copy(self)
+        other.moves_made = set(self.moves_made)
+        other.mines = set(self.mines)
+        other.safes = set(self.safes)
+        other.knowledge = set(self.knowledge)
+        other.index = {cell: set(sentences) for cell, sentences in self.index.items()}
+        other.touched = set(self.touched)
+        other.worklist = collections.deque(self.worklist)
+        other.queued = set(self.queued)
+        other.component_counts = dict(self.component_counts)
+        other.pending = collections.deque(self.pending)
+        other.frontier = list(self.frontier)
+        other.frontier_positions = dict(self.frontier_positions)
+        other.counters = collections.Counter(self.counters)
+        return other
+
+    def cancelled(self):
+        """
+        Checks if the AI has been asked to stop searching early.
+        """
+        return self.cancel is not None and self.cancel.is_set()
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base, leaving out
+        the cells already known to be mines or safe.
+        Empty sentences and sentences already known are skipped.
+        """
+        known = [cell for cell in sentence.cells if cell in self.mines or cell in self.safes]
+        if known:
+            mines = sum(cell in self.mines for cell in known)
+            sentence = Sentence(sentence.cells.difference(known), sentence.count - mines)
+        if not sentence.cells or sentence in self.knowledge:
+            if self.counting and sentence.cells:
+                self.counters["sentences_deduplicated"] += 1
+            return
+
+        if self.counting:
+            self.counters["sentences_created"] += 1
+        self.knowledge.add(sentence)
+        for cell in sentence.cells:
+            self.index.setdefault(cell, set()).add(sentence)
+        self.touched.update(sentence.cells)
+        self.changed(sentence)
+
+    def remove_sentence(self, sentence, cell):
+        """
+        Removes a sentence from the knowledge base, whose entry
+        in the index for the given cell is already gone.
+        """
+        if self.counting:
+            self.counters["sentences_removed"] += 1
+        self.knowledge.discard(sentence)
+        for other in sentence.cells:
+            if other != cell:
+                self.index[other].discard(sentence)
+
+    def changed(self, sentence):
+        """
+        Puts a sentence on the worklist, unless it is already on it.
+        """
+        if sentence not in self.queued:
+            self.queued.add(sentence)
+            self.worklist.append(sentence)
+
+    def add_move(self, cell):
+        """
+        Marks a cell as a move made, and puts the cells around it
+        that are neither moves nor known mines on the frontier.
+        """
+        if cell in self.moves_made:
+            return
+        self.moves_made.add(cell)
+        self.touched.add(cell)
+        self.leave_frontier(cell)
+        for neighbor in self.neighbors[cell]:
+            if neighbor not in self.moves_made and neighbor not in self.mines and neighbor not in self.frontier_positions:
+                self.frontier_positions[neighbor] = len(self.frontier)
+                self.frontier.append(neighbor)
+
+    def leave_frontier(self, cell):
+        """
+        Takes a cell off the frontier, if it is on it, by moving
+        the last cell of the frontier into its place.
+        """
+        position = self.frontier_positions.pop(cell, None)
+        if position is None:
+            return
+        last = self.frontier.pop()
+        if last != cell:
+            self.frontier[position] = last
+            self.frontier_positions[last] = position
 
     def mark_mine(self, cell):
         """
@@ -176,17 +714,31 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self.touched.add(cell)
+        self.leave_frontier(cell)
+        for sentence in self.index.pop(cell, ()):
+            self.remove_sentence(sentence, cell)
+            self.add_sentence(sentence.mark_mine(cell))
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
+        if cell not in self.safes and cell not in self.moves_made:
+            self.pending.append(cell)
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        self.touched.add(cell)
+        for sentence in self.index.pop(cell, ()):
+            self.remove_sentence(sentence, cell)
+            self.add_sentence(sentence.mark_safe(cell))
+
+    def finished(self):
+        """
+        Checks if every cell is either a move made or known to be a mine,
+        so that there are no moves left to make.
+        """
+        return len(self.moves_made) + len(self.mines) == self.height * self.width
 
     def add_knowledge(self, cell, count):
         """
@@ -203,62 +755,351 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
+        self.add_knowledge_many([(cell, count)])
+
+    def add_knowledge_many(self, observations):
+        """
+        Adds what the board told us about several safe cells at once,
+        given as (cell, count) pairs, e.g. every cell uncovered by one
+        click. All the cells are marked before any sentence is added,
+        and conclusions are only drawn once, at the end.
+        """
+        observations = list(observations)
+        self.version += 1
+        if self.counting:
+            self.counters["observations"] += len(observations)
+            start_time = time.perf_counter()
+
+        for cell, _ in observations:
+            self.add_move(cell) #1
+            self.mark_safe(cell) #2
+        if self.counting:
+            marked_time = time.perf_counter()
+            self.counters["seconds_marking"] += marked_time - start_time
+
+        for cell, count in observations:
+            cs = set() #3
+            for neighbor in self.neighbors[cell]:
+                if neighbor not in self.moves_made:
+                    cs.add(neighbor)
+            self.add_sentence(Sentence(cs, count))
+        if self.counting:
+            added_time = time.perf_counter()
+            self.counters["seconds_adding"] += added_time - marked_time
+
+        self.infer() #4 and 5
+        if self.counting:
+            self.counters["seconds_inferring"] += time.perf_counter() - added_time
+
+    def stats(self):
+        """
+        Returns a snapshot of the AI's counters, along with the size of
+        its knowledge and the inference steps taken per observation.
+        The counters only change while self.counting is set.
+        """
+        stats = dict(self.counters)
+        stats["knowledge"] = len(self.knowledge)
+        if self.counters["observations"]:
+            stats["inference_steps_per_observation"] = self.counters["inference_steps"] / self.counters["observations"]
+        return stats
+
+    def infer(self):
+        """
+        Draws conclusions from the sentences on the worklist, and from
+        any sentences those conclusions change, until nothing more can
+        be concluded with the AI's rule set.
+        """
+        while self.worklist:
+            sentence = self.worklist.popleft()
+            self.queued.discard(sentence)
+            if sentence not in self.knowledge:
+                continue
+            if self.counting:
+                self.counters["inference_steps"] += 1
 
-        self.moves_made.add(cell) #1
-        self.mark_safe(cell) #2
-        cs = set() #3
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if (i, j) not in self.moves_made:
-                        cs.add((i, j))
-        #if Sentence(cells, count) not in self.knowledge:
-        self.knowledge.append(Sentence(cs, count))
-        #4
-        i = copy.copy(self.difficulty)
-        while i > 0:
-            #print('1')
-            mine_set = set()
-            safe_set = set()
-            for sentence in self.knowledge:
-                is_mine = sentence.known_mines()
-                is_safe = sentence.known_safes()
-                if is_mine != False:
-                    for m in is_mine:
-                        mine_set.add(m)
-                elif is_safe != False:
-                    for s in is_safe:
-                        safe_set.add(s)
-            if mine_set != None:
-                for m in mine_set:
+            # Mark cells known from the sentence alone
+            is_mine = sentence.known_mines()
+            is_safe = sentence.known_safes()
+            if is_mine != False:
+                for m in list(is_mine):
                     self.mark_mine(m)
-            if safe_set != None:
-                for s in safe_set:
+                continue
+            if is_safe != False:
+                for s in list(is_safe):
                     self.mark_safe(s)
-            for m in self.mines:
-                for sentence in self.knowledge:
-                    sentence.mark_mine(m)
-            i -=1
-        #5
-        #Remove empty sentences
+                continue
+
+            # Deduce new sentences from other sentences sharing its cells
+            if self.difficulty >= SUBSETS:
+                for other in self.infer_from(sentence):
+                    self.add_sentence(other)
+
+    def infer_from(self, sentence):
+        """
+        Returns the new sentences that follow from a sentence together
+        with each other sentence it shares cells with, found through
+        the index rather than by scanning all knowledge.
+        """
+        candidates = set()
+        for cell in sentence.cells:
+            candidates |= self.index[cell]
+        candidates.discard(sentence)
+        if self.counting:
+            self.counters["subset_comparisons"] += len(candidates)
+
+        inferred = []
+        for other in candidates:
+
+            # One sentence within the other
+            if sentence.cells < other.cells:
+                inferred.append(Sentence(other.cells - sentence.cells, other.count - sentence.count))
+            elif other.cells < sentence.cells:
+                inferred.append(Sentence(sentence.cells - other.cells, sentence.count - other.count))
+
+            # Overlapping sentences, where one has as many more mines
+            # as it has cells outside the overlap
+            elif self.difficulty >= OVERLAPS:
+                only_sentence = sentence.cells - other.cells
+                only_other = other.cells - sentence.cells
+                for more, less, more_only, less_only in (
+                    (sentence, other, only_sentence, only_other),
+                    (other, sentence, only_other, only_sentence)
+                ):
+                    if more.count - less.count == len(more_only):
+                        inferred.append(Sentence(more_only, len(more_only)))
+                        inferred.append(Sentence(less_only, 0))
+        return inferred
+
+    def search_linear(self):
+        """
+        Marks the cells that the sentences, taken as linear equations
+        in one 0 or 1 variable per cell, force to be mines or safe.
+
+        The equations are row-reduced first. A cell is then forced in a
+        reduced equation if its other value would put the total out of
+        the range the equation's other cells can reach.
+        Returns whether any cell was marked, which none are if the AI
+        was asked to stop early.
+        """
+        rows = [({cell: 1 for cell in sentence.cells}, sentence.count) for sentence in self.knowledge]
+        mines = set()
+        safes = set()
+        for row, total in row_reduce(rows, self.cancel):
+            if self.cancelled():
+                return False
+            low = sum(a for a in row.values() if a < 0)
+            high = sum(a for a in row.values() if a > 0)
+            for cell, a in row.items():
+                if a > 0:
+                    if total < low + a:
+                        safes.add(cell)
+                    elif total > high - a:
+                        mines.add(cell)
+                else:
+                    if total > high + a:
+                        safes.add(cell)
+                    elif total < low - a:
+                        mines.add(cell)
+
+        for cell in mines:
+            self.mark_mine(cell)
+        for cell in safes - mines:
+            self.mark_safe(cell)
+        self.infer()
+        return bool(mines or safes)
+
+    def components(self):
+        """
+        Splits the cells mentioned in the knowledge into groups linked
+        by shared sentences, and returns them as (cells, sentences) pairs.
+        """
+
+        # Union-find over cells, joining the cells of each sentence
+        parent = {}
+
+        def find(cell):
+            while parent[cell] != cell:
+                parent[cell] = parent[parent[cell]]
+                cell = parent[cell]
+            return cell
+
+        for sentence in self.knowledge:
+            root = None
+            for cell in sentence.cells:
+                top = find(parent.setdefault(cell, cell))
+                if root is None:
+                    root = top
+                elif top != root:
+                    parent[top] = root
+
+        groups = {}
+        for cell in parent:
+            groups.setdefault(find(cell), ([], []))[0].append(cell)
         for sentence in self.knowledge:
-            if len(sentence.cells) == 0:
-                self.knowledge.remove(sentence)
-
-        #Deduce new sentences from subsets
-        i = copy.copy(self.difficulty)
-        while i > 1:
-            append_list = []
-            if self.difficulty > 1:
-                for sentence in self.knowledge:
-                    for subsentence in self.knowledge:
-                        if sentence.cells > subsentence.cells:
-                            append_list.append(Sentence(sentence.cells - subsentence.cells, sentence.count - subsentence.count))
-                            
-            for sentence in append_list:
-                if sentence not in self.knowledge:
-                    self.knowledge.append(sentence)
-            i -=1
+            groups[find(next(iter(sentence.cells)))][1].append(sentence)
+        return list(groups.values())
+
+    def search_components(self):
+        """
+        Marks every cell that is a mine, or safe, in all placements of
+        mines that fit the knowledge, searching each group of linked
+        cells on its own. Groups larger than CSP_MAX_CELLS are skipped.
+        Returns whether any cell was marked.
+        """
+        mines = []
+        safes = []
+        for cells, sentences in self.components():
+            if self.cancelled():
+                break
+            if len(cells) <= CSP_MAX_CELLS:
+                group_mines, group_safes = Component(sentences, self.cancel).forced()
+                mines += group_mines
+                safes += group_safes
+
+        for cell in mines:
+            self.mark_mine(cell)
+        for cell in safes:
+            self.mark_safe(cell)
+        self.infer()
+        return bool(mines or safes)
+
+    def count_components(self):
+        """
+        Returns the placement counts, see Component.count, of each group
+        of linked cells, or None for groups over PROBABILITY_MAX_CELLS.
+
+        Counts are kept by the group's set of sentences, so groups that
+        have not changed since the last call are not counted again.
+        """
+        counts = {}
+        results = []
+        for cells, sentences in self.components():
+            key = frozenset(sentences)
+            if key in self.component_counts:
+                counts[key] = self.component_counts[key]
+            elif len(cells) <= PROBABILITY_MAX_CELLS and not self.cancelled():
+                counts[key] = Component(sentences, self.cancel).count()
+            else:
+                counts[key] = None
+            results.append((cells, sentences, counts[key]))
+
+        # Only keep the counts of groups that still exist
+        self.component_counts = counts
+        return results
+
+    def unconstrained(self):
+        """
+        Returns the number of cells that are neither moves made nor known
+        to be mines or safe, and that no sentence mentions.
+        """
+        return self.height * self.width - len(self.touched)
+
+    def unconstrained_cells(self):
+        """
+        Returns the cells counted by unconstrained, found by going over
+        every cell of the board.
+        """
+        return [
+            (i, j) for i in range(self.height) for j in range(self.width)
+            if (i, j) not in self.touched
+        ]
+
+    def random_unconstrained_cell(self):
+        """
+        Returns a random cell counted by unconstrained, trying random
+        cells of the board first, as most cells are unconstrained until
+        late in a game.
+        """
+        for _ in range(32):
+            cell = divmod(random.randrange(self.height * self.width), self.width)
+            if cell not in self.touched:
+                return cell
+        return random.choice(self.unconstrained_cells())
+
+    def mine_probabilities(self):
+        """
+        Returns a dict from each cell that is neither a move made nor
+        known to be a mine to the chance that it is a mine, taking every
+        placement of mines that fits the knowledge as equally likely.
+
+        With the total number of mines known, placements are weighed by
+        the ways of placing the remaining mines in the cells no sentence
+        mentions. Otherwise the groups are taken on their own, and those
+        cells are given the average chance over the other cells.
+        Groups too large to count are estimated from their sentences.
+        """
+        probabilities, rest = self.constrained_probabilities()
+        if rest is not None:
+            for cell in self.unconstrained_cells():
+                probabilities[cell] = rest
+        return probabilities
+
+    def constrained_probabilities(self):
+        """
+        Returns the chances of mine_probabilities, leaving out the cells
+        no sentence mentions, together with the chance each of those
+        cells has, which is None if the mines left cannot be placed.
+        This takes no time in proportion to the area of the board.
+        """
+        probabilities = {cell: 0.0 for cell in self.safes - self.moves_made}
+
+        # Number of placements with each number of mines of each counted group
+        groups = []
+        estimated = 0
+        for cells, sentences, counts in self.count_components():
+            if counts is None:
+                for cell in cells:
+                    probabilities[cell] = max(sentence.count / len(sentence.cells) for sentence in self.index[cell])
+                    estimated += probabilities[cell]
+            else:
+                groups.append(counts)
+        distributions = [{mines: counts[mines][0] for mines in counts} for counts in groups]
+
+        # Number of cells no sentence mentions
+        rest = self.unconstrained()
+
+        if self.total_mines is None:
+            for counts, distribution in zip(groups, distributions):
+                total = sum(distribution.values())
+                for mines, (solutions, mine_counts) in counts.items():
+                    for cell, count in mine_counts.items():
+                        probabilities[cell] = probabilities.get(cell, 0) + count / total
+            frontier = [probability for cell, probability in probabilities.items() if cell not in self.safes]
+            average = sum(frontier) / len(frontier) if frontier else 0.5
+            return probabilities, average
+
+        # Ways of placing the mines not in any group in the cells no sentence mentions
+        remaining = self.total_mines - len(self.mines) - round(estimated)
+
+        def ways(mines):
+            if 0 <= remaining - mines <= rest:
+                return math.comb(rest, remaining - mines)
+            return 0
+
+        # Placement counts of all groups before and after each one
+        before = [{0: 1}]
+        for distribution in distributions:
+            before.append(convolve(before[-1], distribution))
+        after = [{0: 1}]
+        for distribution in reversed(distributions):
+            after.append(convolve(after[-1], distribution))
+        after.reverse()
+
+        total = sum(count * ways(mines) for mines, count in before[-1].items())
+        if total == 0:
+            # The mines left cannot fit, which only a wrong total can cause
+            return probabilities, None
+
+        for n, counts in enumerate(groups):
+            others = convolve(before[n], after[n + 1])
+            for mines, (solutions, mine_counts) in counts.items():
+                weight = sum(count * ways(mines + other) for other, count in others.items())
+                for cell, count in mine_counts.items():
+                    probabilities[cell] = probabilities.get(cell, 0) + count * weight / total
+        if not rest:
+            return probabilities, None
+        expected = sum(count * ways(mines) * (remaining - mines) for mines, count in before[-1].items())
+        return probabilities, expected / total / rest
 
     def make_safe_move(self):
         """
@@ -266,14 +1107,26 @@ class MinesweeperAI():
         The move must be known to be safe, and not already a move
         that has been made.
 
-        This function may use the knowledge in self.mines, self.safes
-        and self.moves_made, but should not modify any of those values.
+        With a solver other than "rules", once the rules leave no safe
+        move, the AI searches for one, which may mark further mines
+        and safes.
         """
         
-        for position in list(self.safes):
-            if position not in self.moves_made:
-                return position
-        return None
+        while True:
+            while self.pending and self.pending[0] in self.moves_made:
+                self.pending.popleft()
+            if self.pending:
+                return self.pending[0]
+            if self.solver == "rules":
+                return None
+            if self.counting:
+                self.counters["solver_searches"] += 1
+                start_time = time.perf_counter()
+            found = self.search_linear() or (self.solver == "csp" and self.search_components())
+            if self.counting:
+                self.counters["seconds_solving"] += time.perf_counter() - start_time
+            if not found or self.cancelled():
+                return None
 
     def make_random_move(self):
         """
@@ -281,26 +1134,366 @@ class MinesweeperAI():
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+
+        With the "probability" guess, it chooses randomly among the
+        cells least likely to be mines instead.
         """
-        
-        spare = []
 
-        for i in range(self.height):
-            for j in range(self.width):
-                if (i, j) not in self.moves_made and (i, j) not in self.mines:
-                    spared = False
-                    for a in range(i - 1, i + 2):
-                        if spared == True:
-                            break
-                        for b in range(j - 1, j + 2):
-                            if 0 <= a < self.height and 0 <= b < self.width:
-                                if (a, b) in self.moves_made:
-                                    spare.append((i, j))
-                                    spared = True
-                                    break
-                    if (i, j) not in spare:
-                        return (i, j)
-        if len(spare) > 0:
-            return spare[random.randrange(len(spare))]                    
+        if self.guess == "probability":
+            probabilities, rest = self.constrained_probabilities()
+            unconstrained = self.unconstrained() if rest is not None else 0
+            if not probabilities and not unconstrained:
+                return None
+            lowest = min(list(probabilities.values()) + ([rest] if unconstrained else []))
+            cells = sorted(cell for cell, probability in probabilities.items() if probability == lowest)
+
+            # Cells no sentence mentions are only listed if one is chosen
+            n = random.randrange(len(cells) + (unconstrained if unconstrained and rest == lowest else 0))
+            if n < len(cells):
+                return cells[n]
+            return self.random_unconstrained_cell()
+
+        # The first cell in row order away from every move made
+        while self.cursor < self.height * self.width:
+            cell = divmod(self.cursor, self.width)
+            if (cell not in self.moves_made and cell not in self.mines
+                and not any(neighbor in self.moves_made for neighbor in self.neighbors[cell])):
+                return cell
+            self.cursor += 1
+
+        # Otherwise any cell next to a move made
+        if len(self.frontier) > 0:
+            return self.frontier[random.randrange(len(self.frontier))]
         return None
 
+
+
+def row_reduce(rows, cancel=None):
+    """
+    Brings a system of linear equations with integer coefficients into
+    reduced row echelon form, keeping every coefficient an integer.
+    Each equation is a (coefficients, total) pair, the coefficients a
+    dict from variable to coefficient. Returns the equations left with
+    any coefficients. If `cancel` is given, it is an event checked
+    before each variable is cleared; once it is set, the equations are
+    returned only partly reduced.
+    """
+    rows = {n: (dict(coefficients), total) for n, (coefficients, total) in enumerate(rows)}
+
+    # Equations each variable appears in, so clearing a variable only visits those
+    columns = {}
+    for n, (coefficients, _) in rows.items():
+        for variable in coefficients:
+            columns.setdefault(variable, set()).add(n)
+
+    pivots = set()
+    for variable in sorted(columns):
+        if cancel is not None and cancel.is_set():
+            break
+        candidates = [n for n in columns[variable] if n not in pivots]
+        if not candidates:
+            continue
+
+        # Pivot on the shortest equation, which adds the fewest variables to the others
+        pivot = min(candidates, key=lambda n: (len(rows[n][0]), n))
+        pivots.add(pivot)
+        pivot_coefficients, pivot_total = rows[pivot]
+        a = pivot_coefficients[variable]
+
+        # Clear the variable from every other equation, cross-multiplying
+        # instead of dividing and then taking out common factors
+        for n in list(columns[variable]):
+            if n == pivot:
+                continue
+            coefficients, total = rows[n]
+            b = coefficients[variable]
+            combined = {}
+            for other in coefficients.keys() | pivot_coefficients.keys():
+                value = coefficients.get(other, 0) * a - pivot_coefficients.get(other, 0) * b
+                if value:
+                    combined[other] = value
+            total = total * a - pivot_total * b
+            factor = math.gcd(total, *combined.values())
+            if factor > 1:
+                combined = {other: value // factor for other, value in combined.items()}
+                total //= factor
+
+            for other in coefficients.keys() - combined.keys():
+                columns[other].discard(n)
+            for other in combined.keys() - coefficients.keys():
+                columns[other].add(n)
+            rows[n] = (combined, total)
+
+    return [row for row in rows.values() if row[0]]
+
+
+def convolve(first, second):
+    """
+    Returns the number of ways of each total of two independent counts,
+    each given as a dict from count to number of ways.
+    """
+    totals = {}
+    for a, ways_a in first.items():
+        for b, ways_b in second.items():
+            totals[a + b] = totals.get(a + b, 0) + ways_a * ways_b
+    return totals
+
+
+def uncover(game, cell, revealed):
+    """
+    Reveals a safe cell on the board, clearing the area around it if it
+    has no nearby mines. Returns what was uncovered as (cell, count)
+    pairs, for MinesweeperAI.add_knowledge_many.
+    """
+    counts = game.reveal(cell, revealed)
+    revealed.update(counts)
+    return list(counts.items())
+
+
+def play_move(game, ai, cell, revealed):
+    """
+    Reveals a safe cell on the board and tells the AI what was uncovered,
+    returning it as uncover does.
+    """
+    observations = uncover(game, cell, revealed)
+    ai.add_knowledge_many(observations)
+    return observations
+
+
+def backend(bitboard=False, large=False):
+    """
+    Returns the game and AI classes to use: the set-based ones,
+    their bitboard counterparts, or the set-based ones with the
+    game in large-board mode.
+    """
+    if bitboard:
+        from bitboard import BitboardMinesweeper, BitboardMinesweeperAI
+        return BitboardMinesweeper, BitboardMinesweeperAI
+    if large:
+        return LargeMinesweeper, MinesweeperAI
+    return Minesweeper, MinesweeperAI
+
+
+def solve(game, start, difficulty=1, solver="rules", counters=None):
+    """
+    Lets the AI play the board from the starting cell using only moves
+    it knows to be safe.
+
+    Returns whether that solved the board, i.e. whether no cell was left
+    that would need a guess, and the number of moves the AI made.
+    If `counters` is given, the AI counts what it does into it.
+    """
+    _, ai_class = backend(bitboard=not isinstance(game, Minesweeper))
+    ai = ai_class(height=game.height, width=game.width, difficulty=difficulty, solver=solver)
+    if counters is not None:
+        ai.counting = True
+        ai.counters = counters
+    revealed = set()
+    moves = 0
+
+    # Let the AI play safe moves for as long as it can
+    move = start
+    while move is not None:
+        play_move(game, ai, move, revealed)
+        moves += 1
+        move = ai.make_safe_move()
+
+    solved = ai.finished() and ai.mines == game.mines
+    return solved, moves
+
+
+def play_game(game, start, difficulty=1, solver="rules", guess="random"):
+    """
+    Lets the AI play the board from the starting cell to the end,
+    guessing whenever it has no safe move, with the total number of
+    mines known to it. Returns whether it won, i.e. revealed every
+    cell that is not a mine without hitting one.
+    """
+    ai = MinesweeperAI(height=game.height, width=game.width, difficulty=difficulty, solver=solver, guess=guess, total_mines=len(game.mines))
+    revealed = set()
+    safe_cells = game.height * game.width - len(game.mines)
+
+    move = start
+    while move is not None:
+        if game.is_mine(move):
+            return False
+        play_move(game, ai, move, revealed)
+        if len(revealed) == safe_cells:
+            return True
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+    return False
+
+
+def generate_solvable_board(height, width, mines, start, seed=None, difficulty=1, cancel=None, bitboard=False, large=None, solver="rules", ai_stats=False, progress=None, timeout=None):
+    """
+    Searches for a board that the AI can solve from the starting cell
+    without ever having to guess.
+
+    Boards are generated and played out by the AI one after another,
+    until one is found where the AI runs out of safe moves only once
+    every cell is either revealed or known to be a mine.
+
+    Returns the board, along with a dict of search statistics:
+    "attempts", the number of boards tried, "elapsed", the time taken
+    in seconds, and "moves", the number of moves the AI made across all
+    of them, each move being one click. The inference steps the AI took
+    are only counted with `ai_stats`, as "inference_steps" in "ai".
+
+    If `cancel` is given, it is an event checked before each new board;
+    once it is set the search stops and None is returned as the board.
+    The same happens once `timeout` seconds have passed, if given.
+    If `progress` is given, it is a shared integer, such as a
+    multiprocessing.Value, increased by one for each board tried.
+    With `bitboard` set, the search uses the bitboard game and AI.
+    The AI uses the given solver, see MinesweeperAI. With `ai_stats`
+    set, the statistics also hold the AI's counters, see
+    MinesweeperAI.stats, totalled over all boards tried.
+    Large-board mode is used for boards of at least LARGE_BOARD_CELLS
+    cells, unless `large` says otherwise.
+    """
+    if ai_stats and bitboard:
+        raise ValueError("ai_stats not supported by the bitboard AI")
+    if large is None:
+        large = height * width >= LARGE_BOARD_CELLS
+    game_class, _ = backend(bitboard, large)
+    rng = random.Random(seed)
+    start_time = time.time()
+    attempts = 0
+    total_moves = 0
+    counters = collections.Counter() if ai_stats else None
+
+    while (cancel is None or not cancel.is_set()) and (timeout is None or time.time() - start_time < timeout):
+        attempts += 1
+        if progress is not None:
+            with progress.get_lock():
+                progress.value += 1
+        game = game_class(height=height, width=width, mines=mines, starting_position=start, rng=rng)
+        solved, moves = solve(game, start, difficulty=difficulty, solver=solver, counters=counters)
+        total_moves += moves
+        if solved:
+            break
+    else:
+        game = None
+
+    stats = {
+        "attempts": attempts,
+        "elapsed": time.time() - start_time,
+        "moves": total_moves
+    }
+    if ai_stats:
+        stats["ai"] = dict(counters)
+    return game, stats
+
+
+def _search_worker(number, height, width, mines, start, seed, difficulty, bitboard, large, solver, ai_stats, progress, cancel, results):
+    """
+    Runs one board search in a worker process, and always posts its
+    result to the results queue along with the worker's number and the
+    exception the search raised, if any.
+    """
+    result = (None, None)
+    error = None
+    try:
+        result = generate_solvable_board(height, width, mines, start, seed=seed, difficulty=difficulty, cancel=cancel, bitboard=bitboard, large=large, solver=solver, ai_stats=ai_stats, progress=progress)
+    except Exception as exception:
+        # Post what went wrong in a form that is sure to reach the parent
+        error = exception
+        try:
+            pickle.dumps(error)
+        except Exception:
+            error = RuntimeError(repr(exception))
+    finally:
+        results.put((number, result, error))
+
+
+def generate_solvable_board_parallel(height, width, mines, start, seed=None, difficulty=1, workers=None, bitboard=False, large=None, solver="rules", ai_stats=False, cancel=None, progress=None):
+    """
+    Races several worker processes searching for a solvable board from
+    the same starting cell, and returns the first board found.
+
+    Each worker tries its own random boards, seeded from `seed`, and the
+    others are cancelled as soon as one of them succeeds. Defaults to one
+    worker per CPU core. The statistics are those of
+    generate_solvable_board, totalled over all workers.
+
+    `cancel` and `progress` are as for generate_solvable_board: setting
+    `cancel`, which may be a threading.Event, stops every worker, and
+    `progress` must be a multiprocessing.Value to count the boards
+    tried across workers. A worker that dies, e.g. is killed, counts as
+    having found no board, and None is returned if none of them found one.
+    If a worker's search raises, the others are stopped and the exception
+    is raised again here.
+    """
+    if ai_stats and bitboard:
+        raise ValueError("ai_stats not supported by the bitboard AI")
+
+    # Make an AI once, so that options it does not support raise here
+    # rather than in every worker
+    _, ai_class = backend(bitboard, large)
+    ai_class(height=height, width=width, difficulty=difficulty, solver=solver)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        return generate_solvable_board(height, width, mines, start, seed=seed, difficulty=difficulty, cancel=cancel, bitboard=bitboard, large=large, solver=solver, ai_stats=ai_stats, progress=progress)
+
+    start_time = time.time()
+    seeds = random.Random(seed)
+    stop = multiprocessing.Event()
+    results = multiprocessing.Queue()
+
+    processes = []
+    for number in range(workers):
+        process = multiprocessing.Process(
+            target=_search_worker,
+            args=(number, height, width, mines, start, seeds.getrandbits(64), difficulty, bitboard, large, solver, ai_stats, progress, stop, results),
+            daemon=True
+        )
+        process.start()
+        processes.append(process)
+
+    # Every worker posts one result, unless it is killed or fails to post
+    # it, so wait until each has either posted or exited, passing on a
+    # cancel from the caller while waiting
+    board = None
+    stats = {"attempts": 0, "elapsed": 0, "moves": 0, "workers": workers}
+    counters = collections.Counter()
+    failure = None
+    waiting = set(range(workers))
+    while waiting:
+        try:
+            number, (game, worker_stats), error = results.get(timeout=0.1)
+            finished = [number]
+            if error is not None and failure is None:
+                failure = error
+                stop.set()
+        except queue.Empty:
+            if cancel is not None and cancel.is_set():
+                stop.set()
+
+            # A worker that exited has already flushed anything it posted,
+            # so with the queue empty it never posted and counts as finished
+            exited = [number for number in waiting if processes[number].exitcode is not None]
+            if not exited or not results.empty():
+                continue
+            game, worker_stats = None, None
+            finished = exited
+        waiting.difference_update(finished)
+        if game is not None and board is None:
+            board = game
+            stop.set()
+        if worker_stats is not None:
+            stats["attempts"] += worker_stats["attempts"]
+            stats["moves"] += worker_stats["moves"]
+            counters.update(worker_stats.get("ai", {}))
+
+    for process in processes:
+        process.join()
+    if failure is not None:
+        raise failure
+
+    stats["elapsed"] = time.time() - start_time
+    if ai_stats:
+        stats["ai"] = dict(counters)
+    return board, stats
@@ -0,0 +1,105 @@
+import threading
+
+
+class MoveHint():
+    """
+    Works out the AI's next move ahead of time on a background thread,
+    on a snapshot of the AI, so that it is ready when it is asked for.
+
+    Each move is kept with the AI and the version of it that it was
+    worked out for, and only handed out while they still match. A new
+    request sets the cancel event of the snapshot still being worked
+    on, so that its solvers stop early, and its move is dropped. The
+    placement counts a finished snapshot kept are handed back to the AI
+    while it is still the version they were worked out for.
+    """
+
+    def __init__(self):
+
+        # The AI and version last requested, the job waiting to be worked
+        # on, the cancel event of the one being worked on, and the move ready
+        self.requested = None
+        self.job = None
+        self.running = None
+        self.ready = None
+
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def is_current(self, ai):
+        """
+        Checks if a move has already been requested for the AI as it is now.
+        """
+        return self.requested == (ai, ai.version)
+
+    def request(self, ai):
+        """
+        Has the next move worked out for the AI as it is now, dropping
+        any move requested before.
+        """
+        snapshot = ai.snapshot()
+        snapshot.cancel = threading.Event()
+        with self.lock:
+            if self.running is not None:
+                self.running.set()
+            self.requested = (ai, ai.version)
+            self.job = (ai, ai.version, snapshot)
+            self.ready = None
+        self.wake.set()
+
+    def take(self, ai):
+        """
+        Returns the move worked out for the AI as it is now, which is None
+        if it has no moves left, together with the snapshot that worked it
+        out, to carry on with in place of the AI. Returns None if the move
+        is not ready yet.
+        """
+        with self.lock:
+            if self.ready is None or self.ready[:2] != (ai, ai.version):
+                return None
+            _, _, move, snapshot = self.ready
+            self.ready = None
+        snapshot.cancel = None
+        return move, snapshot
+
+    def cancel(self):
+        """
+        Drops any move requested, e.g. once the AI has moved on without it.
+        """
+        with self.lock:
+            if self.running is not None:
+                self.running.set()
+            self.requested = None
+            self.job = None
+            self.ready = None
+
+    def run(self):
+        """
+        Background thread body: works out the move of the latest request.
+        """
+        while True:
+            self.wake.wait()
+            with self.lock:
+                self.wake.clear()
+                job = self.job
+                self.job = None
+                if job is None:
+                    continue
+                ai, version, snapshot = job
+                self.running = snapshot.cancel
+
+            move = snapshot.make_safe_move()
+            if move is None and not snapshot.cancelled():
+                move = snapshot.make_random_move()
+
+            with self.lock:
+                self.running = None
+                if not snapshot.cancelled():
+                    self.ready = (ai, version, move, snapshot)
+
+                    # Let the AI reuse the groups the snapshot counted, even
+                    # if it moves on without taking the move
+                    if ai.version == version:
+                        ai.component_counts = dict(snapshot.component_counts)
@@ -1,9 +1,12 @@
 import pygame
 import sys
 import time
-import copy
+import collections
 
-from minesweeper import Minesweeper, MinesweeperAI
+from board_pool import BoardPool
+from board_search import BoardSearch
+from minesweeper import MinesweeperAI, play_move, uncover
+from move_hint import MoveHint
 
 #*************************************************************************************************************************************************************************
 
@@ -25,17 +28,12 @@ D = 222, 255, 122
 E = 135, 245, 255
 
 # Create game
-pygame.init()
-pygame.display.set_caption("Mindsweeper")
 size = width, height = 900, 600 # Originally 600, 400
-screen = pygame.display.set_mode(size)
+FPS = 60
 game = None
 
 # Fonts
 OPEN_SANS = "assets/fonts/OpenSans-Regular.ttf"
-smallFont = pygame.font.Font(OPEN_SANS, 20)
-mediumFont = pygame.font.Font(OPEN_SANS, 28)
-largeFont = pygame.font.Font(OPEN_SANS, 50)
 ccc = 0 #Colour Change Counting
 
 # Compute board size
@@ -44,14 +42,6 @@ board_width = ((2 / 3) * width) - (BOARD_PADDING * 2)
 board_height = height - (BOARD_PADDING * 2)
 board_origin = (BOARD_PADDING, BOARD_PADDING)
 
-# Add images
-asset_flag = pygame.image.load("assets/images/flag.png")
-#asset_mine = pygame.image.load("assets/images/mine.png")
-
-# Set icon
-asset_icon = pygame.image.load("assets/images/icon.jpg")
-pygame.display.set_icon(asset_icon)
-
 # Keep track of revealed cells, flagged cells, and if a mine was hit
 revealed = set()
 flags = set()
@@ -61,8 +51,22 @@ won = False
 # Check for the first move
 first_move = True
 
-# Check whether or not a safe board has been found
+# Check whether or not a safe board has been found, and the search for one running in the background
 found = False
+search = None
+
+# Statistics of the last board search, and whether to show them and the AI's (F3)
+search_stats = None
+debug = False
+
+# Clicks not yet handled, as (button, position, time) triples, and the time
+# until which clicks are ignored after the screen changes
+clicks = collections.deque()
+ignore_until = 0
+DEBOUNCE = 0.3
+
+# Rendered text of the fixed labels, so each is only rendered once
+labels = {}
 
 # Show instructions initially
 instructions = True
@@ -100,21 +104,19 @@ class Button:
         self.draw()
         self.display_text()
 
-        mouse_x, mouse_y = pygame.mouse.get_pos()
-        click, _, _ = pygame.mouse.get_pressed()
-
-        if self.rect.collidepoint(mouse_x, mouse_y):
-
+        if self.rect.collidepoint(pygame.mouse.get_pos()):
             self.button_color = D
-
-            if click == 1:
-                self.on_click_func()
-
         else:
             self.button_color = C
 
+    def check_click(self, pos):
+        if self.disabled or self.rect is None or not self.rect.collidepoint(pos):
+            return False
+        self.on_click_func()
+        return True
+
     def display_text(self):
-        buttonText = mediumFont.render(self.text, True, self.text_color)
+        buttonText = render_label(mediumFont, self.text, self.text_color)
         buttonTextRect = buttonText.get_rect()
         buttonTextRect.center = self.rect.center
 
@@ -130,49 +132,274 @@ class Button:
     def enable(self):
         self.disabled = False
 
-# Clear function, called only when the number on square_position is 0
-def clear(square_position):
-    clearings = set()
-    tiles = set()
-    checked_tiles = set()
-    clears = set()
-    
-    # Add the cell itself
-    clearings.add(square_position)
-    tiles.add(square_position)
-    clears.add(square_position)
-    
-    while tiles:
-        new_tiles = set()
-        for tile in tiles:
-            for i, j in [(x, y) for x in range(tile[0]-1, tile[0]+2) for y in range(tile[1]-1, tile[1]+2) if 0 <= x < HEIGHT and 0 <= y < WIDTH]:
-                    
-                # Ignore the cell itself
-                if (i, j) == square_position or (i, j) in revealed or (i, j) in checked_tiles:
-                    continue
-
-                # Add the empty squares to the queue
-                if game.nearby_mines((i, j)) == 0:
-                    new_tiles.add((i, j))
-                    clears.add((i, j))
-                    
-        checked_tiles = tiles.copy()
-        tiles = new_tiles.copy()
-    for clear_tile in clears:
-        clearings.add(clear_tile)
-        for i, j in [(x, y) for x in range(clear_tile[0]-1, clear_tile[0]+2) for y in range(clear_tile[1]-1, clear_tile[1]+2) if 0 <= x < HEIGHT and 0 <= y < WIDTH]:
-            if (i, j) not in clears or game.nearby_mines((i, j)) != 0:
-                clearings.add((i, j))
-    return clearings
+# Side buttons of the game screen
+panel_x = (2 / 3) * width + BOARD_PADDING
+panel_width = (width / 3) - BOARD_PADDING * 2
+aiButton = pygame.Rect(panel_x, (1 / 3) * height - 50, panel_width, 50)
+ngButton = pygame.Rect(panel_x, (1 / 3) * height + 20, panel_width, 50)
+resetButton = pygame.Rect(panel_x, (1 / 3) * height + 90, panel_width, 50)
+backButton = pygame.Rect(panel_x, (1 / 3) * height + 250, panel_width, 50)
+
+# Areas of the game screen holding the result and the debug overlay
+status_area = pygame.Rect((2 / 3) * width, (2 / 3) * height - 50, width / 3, 100)
+stats_area = pygame.Rect((2 / 3) * width, height - 95, width / 3, 95)
+
+# Renderer class
+class BoardRenderer():
+    """
+    Draws the game screen. The board is kept on its own surface, and each
+    frame only the cells, buttons and text that changed since the last
+    frame are drawn again and passed to pygame.display.update. Cells are
+    only drawn again once marked, see mark and invalidate_board.
+    """
+
+    def setup(self):
+        """
+        Lays out the board for the current difficulty, with every cell covered,
+        and renders the numbers of nearby mines in the difficulty's font.
+        """
+        self.digits = [gameFont.render(str(n), True, BLACK) for n in range(9)]
+        self.border = int(height * width / 1000) // (HEIGHT * WIDTH)
+        self.surface = pygame.Surface((WIDTH * cell_size, HEIGHT * cell_size))
+        self.cells = [
+            [pygame.Rect(board_origin[0] + j * cell_size, board_origin[1] + i * cell_size, cell_size, cell_size) for j in range(WIDTH)]
+            for i in range(HEIGHT)
+        ]
+
+        # What each cell shows, the cells that may have changed since the
+        # last frame, and whether every cell may have
+        self.shown = {}
+        self.dirty = set()
+        self.stale = False
+        for i in range(HEIGHT):
+            for j in range(WIDTH):
+                self.draw_cell((i, j), None)
+        self.invalidate()
+
+    def mark(self, cells):
+        """
+        Has the next frame check these cells, e.g. after they were revealed or flagged.
+        """
+        self.dirty.update(cells)
+
+    def invalidate_board(self):
+        """
+        Has the next frame check every cell, e.g. after a new game or a reset.
+        """
+        self.stale = True
+
+    def invalidate(self):
+        """
+        Has the next frame draw the whole screen, e.g. after a menu was shown.
+        """
+        self.full = True
+        self.drawn = {}
+
+    def cell_state(self, cell):
+        """
+        Returns what a cell shows: "mine", "flag", its number of
+        nearby mines if revealed, or None if covered.
+        """
+        if lost and game.is_mine(cell):
+            return "mine"
+        elif cell in flags:
+            return "flag"
+        elif cell in revealed:
+            return game.nearby_mines(cell)
+        return None
+
+    def draw_cell(self, cell, state):
+        i, j = cell
+        rect = pygame.Rect(j * cell_size, i * cell_size, cell_size, cell_size)
+        pygame.draw.rect(self.surface, GRAY, rect)
+        pygame.draw.rect(self.surface, WHITE, rect, self.border)
+
+        # Add a mine, flag, or number if needed
+        if state == "mine":
+            self.surface.blit(mine, rect)
+        elif state == "flag":
+            self.surface.blit(flag, rect)
+        elif state is not None:
+            neighbors = self.digits[state]
+            neighborsTextRect = neighbors.get_rect()
+            neighborsTextRect.center = rect.center
+            self.surface.blit(neighbors, neighborsTextRect)
+
+    def draw_board(self):
+        """
+        Draws again the marked cells whose state changed, and returns their screen rects.
+        """
+        if self.stale:
+            changed = [(i, j) for i in range(HEIGHT) for j in range(WIDTH)]
+        else:
+            changed = self.dirty
+        dirty = []
+        for cell in changed:
+            state = self.cell_state(cell)
+            if self.shown.get(cell) != state:
+                self.shown[cell] = state
+                self.draw_cell(cell, state)
+                dirty.append(self.cells[cell[0]][cell[1]])
+        self.dirty = set()
+        self.stale = False
+        return dirty
+
+    def draw_button(self, rect, label, color):
+        """
+        Draws a side button if its color changed, returning whether it did.
+        """
+        if self.drawn.get(label) == color:
+            return False
+        self.drawn[label] = color
+        pygame.draw.rect(screen, color, rect)
+        buttonText = render_label(mediumFont, label, BLACK)
+        buttonRect = buttonText.get_rect()
+        buttonRect.center = rect.center
+        screen.blit(buttonText, buttonRect)
+        return True
+
+    def draw_lines(self, key, area, lines, font, color, center):
+        """
+        Draws lines of text over an area if they changed, returning whether they did.
+        """
+        if self.drawn.get(key) == lines:
+            return False
+        self.drawn[key] = lines
+        screen.fill(A, area)
+        for n, line in enumerate(lines):
+            text = font.render(line, True, color)
+            textRect = text.get_rect()
+            if center:
+                textRect.center = (area.centerx, area.centery + (n - (len(lines) - 1) / 2) * font.get_linesize())
+            else:
+                textRect.topleft = (panel_x, area.y + 3 + n * 14)
+            screen.blit(text, textRect)
+        return True
+
+    def draw(self, status):
+        """
+        Brings the screen up to date with the game, showing the lines of `status` below the buttons.
+        """
+        dirty = self.draw_board()
+        if self.full:
+            screen.fill(A)
+            screen.blit(self.surface, board_origin)
+        else:
+            for rect in dirty:
+                screen.blit(self.surface, rect, rect.move(-board_origin[0], -board_origin[1]))
+
+        # Buttons are highlighted under the mouse, and grayed out when they cannot be used
+        mouse = pygame.mouse.get_pos()
+        buttons = [
+            (aiButton, "AI Move", not won and not lost and search is None),
+            (ngButton, "New Game", game or search),
+            (resetButton, "Reset", fmove),
+            (backButton, "Back", True)
+        ]
+        for rect, label, enabled in buttons:
+            if not enabled:
+                color = GRAY
+            elif rect.collidepoint(mouse):
+                color = D
+            else:
+                color = C
+            if self.draw_button(rect, label, color):
+                dirty.append(rect)
+
+        if self.draw_lines("status", status_area, status, mediumFont, WHITE, True):
+            dirty.append(status_area)
+        if self.draw_lines("stats", stats_area, stats_lines() if debug else (), debugFont, BLACK, False):
+            dirty.append(stats_area)
+
+        if self.full:
+            self.full = False
+            pygame.display.update()
+        elif dirty:
+            pygame.display.update(dirty)
+
+# Returns a fixed label rendered in the given font and color, rendering it only the first time
+def render_label(font, text, color):
+    key = (font, text, color)
+    if key not in labels:
+        labels[key] = font.render(text, True, color)
+    return labels[key]
+
+# Returns the oldest click not yet handled as a (button, position) pair, or None,
+# skipping clicks made too soon after the screen changed
+def next_click():
+    while clicks:
+        button, pos, when = clicks.popleft()
+        if when >= ignore_until:
+            return button, pos
+    return None
+
+# Ignores clicks for a moment after the screen changes, without pausing the game
+def debounce():
+    global ignore_until
+    ignore_until = time.time() + DEBOUNCE
+
+# Returns the board cell at a screen position, or None if it is off the board
+def cell_at(pos):
+    i = int((pos[1] - board_origin[1]) // cell_size)
+    j = int((pos[0] - board_origin[0]) // cell_size)
+    if 0 <= i < HEIGHT and 0 <= j < WIDTH:
+        return (i, j)
+    return None
 
 # Returns the amount of nearby flags
 def nearby_flags(square):
     n_flags = 0
-    for i, j in [(x, y) for x in range(square[0]-1, square[0]+2) for y in range(square[1]-1, square[1]+2) if 0 <= x < HEIGHT and 0 <= y < WIDTH]:
-        if (i, j) in flags:
+    for neighbor in game.neighbors[square]:
+        if neighbor in flags:
             n_flags += 1
     return n_flags
 
+# Search for a board that can be solved from the first move without guessing
+def search_board(first):
+    global search
+
+    # Only search if no board has been made in advance
+    board = pool.take(HEIGHT, WIDTH, MINES, first, difficulty_level, solver)
+    if board is None:
+        search = BoardSearch(HEIGHT, WIDTH, MINES, first, difficulty = difficulty_level, solver = solver, ai_stats = debug)
+    else:
+        start_game(first, board, None)
+
+# Start the game on a found board with the first move made
+def start_game(first, board, stats):
+    global game
+    global ai
+    global revealed
+    global flags
+    global lost
+    global found
+    global first_move
+    global fmove
+    global start_time
+    global search_stats
+
+    game = board
+    search_stats = stats
+    revealed = set()
+    flags = set()
+    lost = False
+    ai = MinesweeperAI(height=HEIGHT, width=WIDTH, difficulty = difficulty_level, solver = solver, guess = "probability", total_mines = MINES)
+    ai.counting = debug
+    play_move(game, ai, first, revealed)
+    renderer.invalidate_board()
+    first_move = False
+    found = True
+    fmove = first
+    start_time = time.time()
+
+# Stop the background board search, if one is running
+def cancel_search():
+    global search
+
+    if search is not None:
+        search.cancel()
+        search = None
+
 #*************************************************************************************************************************************************************************
 
 # Helper functions
@@ -185,14 +412,37 @@ def on_click():
     choose_difficulty = True
     main_menu = False
 
-    time.sleep(0.3)
+    debounce()
+
+def stats_lines():
+    """
+    Returns the lines of the debug overlay: the AI's counters and
+    the statistics of the last board search.
+    """
+    stats = ai.stats()
+    if search is not None:
+        lines = ["search: running"]
+    elif search_stats is None:
+        lines = ["board: from pool"]
+    else:
+        lines = [f"search: {search_stats['attempts']} boards, {search_stats['elapsed']:.2f}s"]
+    lines += [
+        f"knowledge {stats['knowledge']}  made {stats.get('sentences_created', 0)}",
+        f"dup {stats.get('sentences_deduplicated', 0)}  removed {stats.get('sentences_removed', 0)}",
+        f"steps/obs {stats.get('inference_steps_per_observation', 0):.2f}  cmp {stats.get('subset_comparisons', 0)}",
+        f"ms mark {stats.get('seconds_marking', 0) * 1000:.1f}  add {stats.get('seconds_adding', 0) * 1000:.1f}",
+        f"ms infer {stats.get('seconds_inferring', 0) * 1000:.1f}  solve {stats.get('seconds_solving', 0) * 1000:.1f}"
+    ]
+    return tuple(lines)
 
 def quit_game():
+    cancel_search()
+    pool.stop()
     pygame.quit()
     quit()
 
 def go_back():
-    time.sleep(0.3)
+    debounce()
 
     global show_instructions
     global main_menu
@@ -208,7 +458,7 @@ def go_back():
     main_menu = True
 
 def rules_page():
-    time.sleep(0.3)
+    debounce()
 
     global show_instructions
     global main_menu
@@ -241,6 +491,7 @@ def diff_easy():
     global mine
     global gameFont
     global difficulty_level
+    global solver
     global fmove
 
     HEIGHT = 8
@@ -255,13 +506,16 @@ def diff_easy():
     mine = pygame.image.load("assets/images/mine_easy.png")
 
     difficulty_level = 1
+    solver = "rules"
+    pool.want(HEIGHT, WIDTH, MINES, difficulty_level, solver)
 
-    ai = MinesweeperAI(height=HEIGHT, width=WIDTH, difficulty = difficulty_level)
+    ai = MinesweeperAI(height=HEIGHT, width=WIDTH, difficulty = difficulty_level, solver = solver, guess = "probability", total_mines = MINES)
     gameFont = pygame.font.Font(OPEN_SANS, 40)
+    renderer.setup()
 
     fmove = None
 
-    time.sleep(0.3)
+    debounce()
 
 def diff_medium():
     global HEIGHT
@@ -274,6 +528,7 @@ def diff_medium():
     global mine
     global gameFont
     global difficulty_level
+    global solver
     global fmove
 
     HEIGHT = 12
@@ -288,13 +543,16 @@ def diff_medium():
     mine = pygame.image.load("assets/images/mine_medium.png")
 
     difficulty_level = 2
+    solver = "csp"
+    pool.want(HEIGHT, WIDTH, MINES, difficulty_level, solver)
 
-    ai = MinesweeperAI(height=HEIGHT, width=WIDTH, difficulty = difficulty_level)
+    ai = MinesweeperAI(height=HEIGHT, width=WIDTH, difficulty = difficulty_level, solver = solver, guess = "probability", total_mines = MINES)
     gameFont = pygame.font.Font(OPEN_SANS, 30)
+    renderer.setup()
 
     fmove = None
 
-    time.sleep(0.3)
+    debounce()
 
 def diff_hard():
     global HEIGHT
@@ -307,6 +565,7 @@ def diff_hard():
     global mine
     global gameFont
     global difficulty_level
+    global solver
     global fmove
 
     HEIGHT = 16
@@ -321,13 +580,16 @@ def diff_hard():
     mine = pygame.image.load("assets/images/mine_hard.png")
     
     difficulty_level = 3
+    solver = "csp"
+    pool.want(HEIGHT, WIDTH, MINES, difficulty_level, solver)
 
-    ai = MinesweeperAI(height=HEIGHT, width=WIDTH, difficulty = difficulty_level)
+    ai = MinesweeperAI(height=HEIGHT, width=WIDTH, difficulty = difficulty_level, solver = solver, guess = "probability", total_mines = MINES)
     gameFont = pygame.font.Font(OPEN_SANS, 20)
+    renderer.setup()
 
     fmove = None
     
-    time.sleep(0.3)
+    debounce()
 
 # Back to main menu
 def diff_back():
@@ -339,7 +601,7 @@ def diff_back():
     choose_difficulty = False
     main_menu = True
     
-    time.sleep(0.3)
+    debounce()
 
 easy_button = Button(-75, "Easy", diff_easy)
 medium_button = Button(0, "Medium", diff_medium)
@@ -348,443 +610,305 @@ diff_back_button = Button(150, "Back", diff_back)
 
 #*************************************************************************************************************************************************************************
 
-# Lmb and Rmb mouse button down controllers
-lmb_pressed = False
-rmb_pressed = False
-
-# Actual game runner
-while True:
-
-    # Check if game quit
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            quit()
-        #elif event.type == pygame.VIDEORESIZE:
-            #size = width, height = event.w, event.h
-            #screen = pygame.display.set_mode(size, pygame.RESIZABLE)
-
-    screen.fill(A)
-
-    # Show game instructions
-    if instructions:
-
-        # Title
-        title = largeFont.render("Play Mindsweeper", True, WHITE)
-        titleRect = title.get_rect()
-        titleRect.center = ((width / 2), 50)
-        screen.blit(title, titleRect)
-
-        if ccc == 0:
-            ccu = True
-            changed_colour = E
-        elif ccc == 200:
-            ccu = False
-            changed_colour = D
-
-        if ccu == True:
-            ccc += 1
-        elif ccu == False:
-            ccc -= 1
+# The board search starts worker processes, which may import this module
+# again, so only open the window and run the game when run as a script
+if __name__ == "__main__":
+
+    pygame.init()
+    pygame.display.set_caption("Mindsweeper")
+    screen = pygame.display.set_mode(size)
+
+    # Fonts
+    smallFont = pygame.font.Font(OPEN_SANS, 20)
+    mediumFont = pygame.font.Font(OPEN_SANS, 28)
+    largeFont = pygame.font.Font(OPEN_SANS, 50)
+    debugFont = pygame.font.Font(OPEN_SANS, 12)
+
+    # Game screen renderer, laid out when a difficulty is chosen
+    renderer = BoardRenderer()
+
+    # Add images
+    asset_flag = pygame.image.load("assets/images/flag.png")
+    #asset_mine = pygame.image.load("assets/images/mine.png")
+
+    # Set icon
+    asset_icon = pygame.image.load("assets/images/icon.jpg")
+    pygame.display.set_icon(asset_icon)
+
+    # Keep boards for every difficulty ready in the background, Easy first
+    pool = BoardPool()
+    pool.want(16, 16, 48, 3, "csp")
+    pool.want(12, 12, 24, 2, "csp")
+    pool.want(8, 8, 8, 1, "rules")
+    pool.start()
+
+    # Works out the AI's next move in the background, ready for the AI Move button
+    hint = MoveHint()
+
+    # Limits the frame rate, so the game does not keep a core busy
+    clock = pygame.time.Clock()
+
+    # Actual game runner
+    while True:
+        clock.tick(FPS)
+
+        # Check if game quit, and queue clicks to handle in order
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                quit_game()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                debug = not debug
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button in (1, 3):
+                clicks.append((event.button, event.pos, time.time()))
+            #elif event.type == pygame.VIDEORESIZE:
+                #size = width, height = event.w, event.h
+                #screen = pygame.display.set_mode(size, pygame.RESIZABLE)
+
+        # Show game instructions
+        if instructions:
+            screen.fill(A)
+
+            # Title
+            title = render_label(largeFont, "Play Mindsweeper", WHITE)
+            titleRect = title.get_rect()
+            titleRect.center = ((width / 2), 50)
+            screen.blit(title, titleRect)
+
+            if ccc == 0:
+                ccu = True
+                changed_colour = E
+            elif ccc == 200:
+                ccu = False
+                changed_colour = D
+
+            if ccu == True:
+                ccc += 1
+            elif ccu == False:
+                ccc -= 1
             
-        title = mediumFont.render("A smarter version of Minesweeper!", True, changed_colour)
-        titleRect = title.get_rect()
-        titleRect.center = ((width / 2), 100)
-        screen.blit(title, titleRect)
-        
-        if main_menu:
-            title = smallFont.render("Made by I play Minecraft#4015, Kame Blitz#0438, RedDragonNM#8729 and SecretSpectre#5909", True, B)
+            title = render_label(mediumFont, "A smarter version of Minesweeper!", changed_colour)
             titleRect = title.get_rect()
-            titleRect.center = ((width / 2), 580)
-            #screen.blit(title, titleRect)
-
-        if show_instructions:
-            # Rules
-            rules = [
-                "Click a cell to reveal it",
-                "Right-click a cell to mark it as a mine",
-                "Right-click on a revealed cell to dig up all nearby cells if all nearby mines are flagged",
-                "Mark all mines successfully to win!",
-                "",
-                "",
-                "The AI Move button is there to get you out of a tricky situation",
-                "The New Game button generates a new mine field",
-                "The Reset button allows you to restart your game on the same mine field"       
-            ]
-            for i, rule in enumerate(rules):
-                line = smallFont.render(rule, True, (255, 221, 128))
-                lineRect = line.get_rect()
-                lineRect.center = ((width / 2), 200 + 30 * i)
-                screen.blit(line, lineRect)
-
-        play_button.check_everything()
-        quit_button.check_everything()
-        rules_button.check_everything()
-
-        pygame.display.update()
-        continue
-
-    if choose_difficulty:
-        
-        title = largeFont.render("Select the difficulty", True, WHITE)
-        titleRect = title.get_rect()
-        titleRect.center = ((width / 2), 100)
-        screen.blit(title, titleRect)
+            titleRect.center = ((width / 2), 100)
+            screen.blit(title, titleRect)
         
-        easy_button.check_everything()
-        medium_button.check_everything()
-        hard_button.check_everything()
-
-        diff_back_button.check_everything()
-
-        game = None
-        fmove = None
-        #won = False
-
-        pygame.display.update()
-        continue
-
-    #######################################################################################################################################################
-
-    if first_move == True or found == True:
-        # Draw board
-        cells = []
-        for i in range(HEIGHT):
-            row = []
-            for j in range(WIDTH):
-
-                # Draw rectangle for cell
-                rect = pygame.Rect(
-                    board_origin[0] + j * cell_size,
-                    board_origin[1] + i * cell_size,
-                    cell_size, cell_size
-                )
-                pygame.draw.rect(screen, GRAY, rect)
-                pygame.draw.rect(screen, WHITE, rect, int(height * width / 1000) // (HEIGHT * WIDTH))
-
-                if not first_move:
-
-                    # Add a mine, flag, or number if needed
-                    if game.is_mine((i, j)) and lost:
-                        screen.blit(mine, rect)
-                    elif (i, j) in flags:
-                        screen.blit(flag, rect)
-                    elif (i, j) in revealed:
-                        neighbors = gameFont.render(
-                            str(game.nearby_mines((i, j))),
-                            True, BLACK
-                        )
-                        neighborsTextRect = neighbors.get_rect()
-                        neighborsTextRect.center = rect.center
-                        screen.blit(neighbors, neighborsTextRect)
-
-                row.append(rect)
-            cells.append(row)
-
-        # AI Move button
-        aiButton = pygame.Rect(
-            (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
-            (width / 3) - BOARD_PADDING * 2, 50
-        )
-        buttonText = mediumFont.render("AI Move", True, BLACK)
-        buttonRect = buttonText.get_rect()
-        buttonRect.center = aiButton.center
-
-        if not won and not lost:
-            if aiButton.collidepoint(pygame.mouse.get_pos()):
-                color_ai = D
-            else:
-                color_ai = C
-        else:
-            color_ai = GRAY
-
-        pygame.draw.rect(screen, color_ai, aiButton)
-        screen.blit(buttonText, buttonRect)
-
-        # New Game button
-        ngButton = pygame.Rect(
-            (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 20,
-            (width / 3) - BOARD_PADDING * 2, 50
-        )
-        buttonText = mediumFont.render("New Game", True, BLACK)
-        buttonRect = buttonText.get_rect()
-        buttonRect.center = ngButton.center
-
-        if game:
-            if ngButton.collidepoint(pygame.mouse.get_pos()):
-                color_ng = D
-            else:
-                color_ng = C
-        else:
-            color_ng = GRAY
-
-        pygame.draw.rect(screen, color_ng, ngButton)
-        screen.blit(buttonText, buttonRect)
-
-        # Reset Button
-        resetButton = pygame.Rect(
-            (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 90,
-            (width / 3) - BOARD_PADDING * 2, 50
-        )
-        buttonText = mediumFont.render("Reset", True, BLACK)
-        buttonRect = buttonText.get_rect()
-        buttonRect.center = resetButton.center
-
-        if fmove:
-            if resetButton.collidepoint(pygame.mouse.get_pos()):
-                color_reset = D
-            else:
-                color_reset = C
-        else:
-            color_reset = GRAY
-
-        pygame.draw.rect(screen, color_reset, resetButton)
-        screen.blit(buttonText, buttonRect)
-
-        # Back to difficulty selection button
-        backButton = pygame.Rect(
-            (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 250,
-            (width / 3) - BOARD_PADDING * 2, 50
-        )
-        buttonText = mediumFont.render("Back", True, BLACK)
-        buttonRect = buttonText.get_rect()
-        buttonRect.center = backButton.center
-
-        if backButton.collidepoint(pygame.mouse.get_pos()):
-            color_ai = D
-        else:
-            color_ai = C
-
-        pygame.draw.rect(screen, color_ai, backButton)
-        screen.blit(buttonText, buttonRect)
-
-    if not first_move and found == True:
-
-        # Display text
-        if game.mines == flags and won == False:
-            won = True
-            text = f"Won: {'{:.2f}'.format(time.time() - start_time)}s"
-        elif won == True:
-            pass
-        else:
-            text = "Lost" if lost else ""
-        dtext = mediumFont.render(text, True, WHITE)
-        textRect = dtext.get_rect()
-        textRect.center = ((5 / 6) * width, (2 / 3) * height)
-        screen.blit(dtext, textRect)
-
-    move = None
-
-    left, _, right = pygame.mouse.get_pressed()
-
-    # Left mouse button DOWN detection
-    if left and lmb_pressed:
-        left = False
-    elif not left and lmb_pressed:
-        lmb_pressed = False
-    elif left and not lmb_pressed:
-        lmb_pressed = True
-
-    # Right mouse button DOWN detection
-    if right and rmb_pressed:
-        right = False
-    elif not right and rmb_pressed:
-        rmb_pressed = False
-    elif right and not rmb_pressed:
-        rmb_pressed = True
-
-    # Search for a safe board
-    if found == False and first_move == False:
-        move = ai.make_safe_move()
-        if move is None:
-            move = ai.make_random_move()
-            if move is None:
-                flags = ai.mines.copy()
-                #print("No moves left to make.")
-            else:
-                ai = MinesweeperAI(height=HEIGHT, width=WIDTH, difficulty = difficulty_level)
-                revealed = set()
-                flags = set()
-                lost = False
-                game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES, starting_position = fmove)
-                move = fmove
-                #print("Unsafe board")
-        #else:
-            #print("AI making safe move.")
-
-    # Check for a right-click to toggle flagging
-    elif right == 1 and not lost:
-        if not first_move:
-
-            mouse = pygame.mouse.get_pos()
-
-            for i, j in [(x, y) for x in range(HEIGHT) for y in range(WIDTH)]:
-
-                if cells[i][j].collidepoint(mouse):
-
-                    if (i, j) not in revealed:
+            if main_menu:
+                title = render_label(smallFont, "Made by I play Minecraft#4015, Kame Blitz#0438, RedDragonNM#8729 and SecretSpectre#5909", B)
+                titleRect = title.get_rect()
+                titleRect.center = ((width / 2), 580)
+                #screen.blit(title, titleRect)
+
+            if show_instructions:
+                # Rules
+                rules = [
+                    "Click a cell to reveal it",
+                    "Right-click a cell to mark it as a mine",
+                    "Right-click on a revealed cell to dig up all nearby cells if all nearby mines are flagged",
+                    "Mark all mines successfully to win!",
+                    "",
+                    "",
+                    "The AI Move button is there to get you out of a tricky situation",
+                    "The New Game button generates a new mine field",
+                    "The Reset button allows you to restart your game on the same mine field"       
+                ]
+                for i, rule in enumerate(rules):
+                    line = render_label(smallFont, rule, (255, 221, 128))
+                    lineRect = line.get_rect()
+                    lineRect.center = ((width / 2), 200 + 30 * i)
+                    screen.blit(line, lineRect)
+
+            play_button.check_everything()
+            quit_button.check_everything()
+            rules_button.check_everything()
+
+            click = next_click()
+            while click is not None:
+                button, mouse = click
+                if button == 1:
+                    for menu_button in (play_button, quit_button, rules_button):
+                        if menu_button.check_click(mouse):
+                            break
+                click = next_click()
+
+            renderer.invalidate()
+            pygame.display.update()
+            continue
 
-                        if (i, j) in flags:
-                            flags.remove((i, j))
-                        else:
-                            flags.add((i, j))
+        if choose_difficulty:
+            screen.fill(A)
+            title = render_label(largeFont, "Select the difficulty", WHITE)
+            titleRect = title.get_rect()
+            titleRect.center = ((width / 2), 100)
+            screen.blit(title, titleRect)
+        
+            easy_button.check_everything()
+            medium_button.check_everything()
+            hard_button.check_everything()
 
-                        time.sleep(0.1)
-                        break
+            diff_back_button.check_everything()
 
-                    else:
+            click = next_click()
+            while click is not None:
+                button, mouse = click
+                if button == 1:
+                    for diff_button in (easy_button, medium_button, hard_button, diff_back_button):
+                        if diff_button.check_click(mouse):
+                            break
+                click = next_click()
 
-                        if game.nearby_mines((i, j)) == nearby_flags((i, j)):
-                            for a, b in [(x, y) for x in range(i-1, i+2) for y in range(j-1, j+2) if 0 <= x < HEIGHT and 0 <= y < WIDTH]:
-                                if (a, b) not in revealed and (a, b) not in flags:
-                                    if game.is_mine((a, b)):
-                                        lost = True
-                                    else:
-                                        nearby = game.nearby_mines((a, b))
-                                        if nearby == 0:
-                                            cleared_squares = clear((a, b))
-                                            for square in cleared_squares:
-                                                revealed.add(square)
-                                                if game.nearby_mines(square) == 0:
-                                                    ai.moves_made.add(square)
-                                                    ai.mark_safe(square)
-                                                else:
-                                                    ai.add_knowledge(square, game.nearby_mines(square))
-                                        else:
-                                            revealed.add((a, b))
-                                            ai.add_knowledge((a, b), nearby)
-                        time.sleep(0.1)
-
-    elif left == 1:
-        mouse = pygame.mouse.get_pos()
-
-        # If AI button clicked, make an AI move
-        if aiButton.collidepoint(mouse) and not lost and not won:
-            move = ai.make_safe_move()
-            if move is None:
-                move = ai.make_random_move()
-                if move is None:
-                    flags = ai.mines.copy()
-                    #if won == False:
-                        #print("No moves left to make.")
-                #else:
-                    #print("No known safe moves, AI making random move.")
-            #else:
-                #print("AI making safe move.")
-                
-            if move is not None and first_move:
-                fmove = copy.copy(move)
-                game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES, starting_position = fmove)
-                screen.fill(BLACK)
-                title = largeFont.render("Loading...", True, WHITE)
-                titleRect = title.get_rect()
-                titleRect.center = ((width / 2), 200)
-                screen.blit(title, titleRect)
-                title = mediumFont.render("Searching for a safe board", True, WHITE)
-                titleRect = title.get_rect()
-                titleRect.center = ((width / 2), 500)
-                screen.blit(title, titleRect)
-                pygame.display.update()
-                first_move = False
-            #time.sleep(0.2)
-
-        # New Game
-        elif ngButton.collidepoint(mouse) and game:
             game = None
-            ai = MinesweeperAI(height=HEIGHT, width=WIDTH, difficulty = difficulty_level)
-            first_move = True
-            revealed = set()
-            flags = set()
-            lost = False
-            found = False
-            won = False
             fmove = None
-            time.sleep(0.1)
+            #won = False
+
+            renderer.invalidate()
+            pygame.display.update()
             continue
 
-        elif resetButton.collidepoint(mouse) and fmove:
-            if fmove:
-                ai = MinesweeperAI(height=HEIGHT, width=WIDTH, difficulty = difficulty_level)
-                revealed = set()
-                flags = set()
-                lost = False
-                move = fmove
-                start_time = time.time()
-                won = False
-                time.sleep(0.2)
-
-        elif backButton.collidepoint(mouse):
-            first_move = True
-            revealed = set()
-            flags = set()
-            lost = False
-            found = False
-            won = False
-            choose_difficulty = True
-            time.sleep(0.3)
-
-        # User-made move
-        elif not lost:
-            for i, j in [(x, y) for x in range(HEIGHT) for y in range(WIDTH)]:
-                if (cells[i][j].collidepoint(mouse)
-                    and (i, j) not in flags
-                    and (i, j) not in revealed):
-                    move = (i, j)
-                    if first_move:
-                        fmove = copy.copy(move)
-                        game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES, starting_position = fmove)
-                        screen.fill(BLACK)
-                        title = largeFont.render("Loading...", True, WHITE)
-                        titleRect = title.get_rect()
-                        titleRect.center = ((width / 2), 200)
-                        screen.blit(title, titleRect)
-                        title = mediumFont.render("Searching for a safe board", True, WHITE)
-                        titleRect = title.get_rect()
-                        titleRect.center = ((width / 2), 500)
-                        screen.blit(title, titleRect)
-                        pygame.display.update()
-                        first_move = False
-                    break
-
-    # Make move and update AI knowledge
-    if move:
-        if game.is_mine(move):
-            lost = True
-        else:
-            nearby = game.nearby_mines(move)
-            if nearby == 0:
-                cleared_squares = clear(move)
-                for square in cleared_squares:
-                    revealed.add(square)
-                    if game.nearby_mines(square) == 0:
-                        ai.moves_made.add(square)
-                        ai.mark_safe(square)
+        #######################################################################################################################################################
+
+        # The debug overlay also has the AI count what it does
+        if first_move == True or found == True:
+            ai.counting = debug
+
+        # Start the game once the background search has found a board
+        if search is not None:
+            result = search.result()
+            if result is not None:
+                board, stats = result
+                if board is not None:
+                    start_game(search.start, board, stats)
+                search = None
+
+        # Handle the clicks made since the last frame, in order, until one leaves the board
+        click = next_click()
+        while click is not None and not choose_difficulty:
+            button, mouse = click
+            move = None
+            square = cell_at(mouse)
+
+            # Check for a right-click to toggle flagging
+            if button == 3 and not lost:
+                if not first_move and square is not None:
+
+                    if square not in revealed:
+
+                        renderer.mark([square])
+                        if square in flags:
+                            flags.remove(square)
+                        else:
+                            flags.add(square)
+
+                    elif game.nearby_mines(square) == nearby_flags(square):
+                        # Tell the AI about every cell the chord uncovers at once
+                        observations = []
+                        for a, b in game.neighbors[square]:
+                            if (a, b) not in revealed and (a, b) not in flags:
+                                if game.is_mine((a, b)):
+                                    lost = True
+                                    renderer.mark(game.mines)
+                                else:
+                                    observations += uncover(game, (a, b), revealed)
+                        ai.add_knowledge_many(observations)
+                        renderer.mark(cell for cell, _ in observations)
+
+            elif button == 1:
+
+                # If AI button clicked, make an AI move
+                if aiButton.collidepoint(mouse) and not lost and not won and search is None:
+
+                    # Carry on with the AI that worked out the move in the background, if it is ready
+                    hinted = hint.take(ai)
+                    if hinted is not None:
+                        move, ai = hinted
                     else:
-                        ai.add_knowledge(square, game.nearby_mines(square))
+                        hint.cancel()
+                        move = ai.make_safe_move()
+                        if move is None:
+                            move = ai.make_random_move()
+                            #if move is not None:
+                                #print("No known safe moves, AI making random move.")
+                        #else:
+                            #print("AI making safe move.")
+                    if move is None:
+                        renderer.mark(flags | ai.mines)
+                        flags = ai.mines.copy()
+                        #if won == False:
+                            #print("No moves left to make.")
+                    
+                    if move is not None and first_move:
+                        search_board(move)
+                        move = None
+
+                # New Game
+                elif ngButton.collidepoint(mouse) and (game or search):
+                    cancel_search()
+                    game = None
+                    ai = MinesweeperAI(height=HEIGHT, width=WIDTH, difficulty = difficulty_level, solver = solver, guess = "probability", total_mines = MINES)
+                    first_move = True
+                    revealed = set()
+                    flags = set()
+                    lost = False
+                    found = False
+                    won = False
+                    fmove = None
+                    renderer.invalidate_board()
+
+                elif resetButton.collidepoint(mouse) and fmove:
+                    ai = MinesweeperAI(height=HEIGHT, width=WIDTH, difficulty = difficulty_level, solver = solver, guess = "probability", total_mines = MINES)
+                    revealed = set()
+                    flags = set()
+                    lost = False
+                    move = fmove
+                    start_time = time.time()
+                    won = False
+                    renderer.invalidate_board()
+
+                elif backButton.collidepoint(mouse):
+                    cancel_search()
+                    first_move = True
+                    revealed = set()
+                    flags = set()
+                    lost = False
+                    found = False
+                    won = False
+                    choose_difficulty = True
+                    debounce()
+
+                # User-made move
+                elif not lost and search is None and square is not None and square not in flags and square not in revealed:
+                    move = square
+                    if first_move:
+                        search_board(move)
+                        move = None
+
+            # Make move and update AI knowledge
+            if move:
+                if game.is_mine(move):
+                    lost = True
+                    renderer.mark(game.mines)
+                else:
+                    renderer.mark(cell for cell, _ in play_move(game, ai, move, revealed))
+            click = next_click()
+
+        # Work out the AI's next move while the player thinks
+        if found and not first_move and not lost and not won and not hint.is_current(ai):
+            hint.request(ai)
+
+        if not choose_difficulty:
+
+            # Display the progress of the board search, or the result
+            if search is not None:
+                attempts, elapsed = search.progress()
+                status = ("Searching...", f"{attempts} boards, {'{:.1f}'.format(elapsed)}s")
             else:
-                revealed.add(move)
-                ai.add_knowledge(move, nearby)
-
-    try:
-        if game.mines == flags and found == False:
-            found = True
-            revealed = set()
-            flags = set()
-            ai = MinesweeperAI(height=HEIGHT, width=WIDTH, difficulty = difficulty_level)
-            nearby = game.nearby_mines(fmove)
-            if nearby == 0:
-                cleared_squares = clear(fmove)
-                for square in cleared_squares:
-                    revealed.add(square)
-                    if game.nearby_mines(square) == 0:
-                        ai.moves_made.add(square)
-                        ai.mark_safe(square)
-                    else:
-                        ai.add_knowledge(square, game.nearby_mines(square))
-            start_time = time.time()
-    except Exception:
-        pass
-
-    if first_move == True or found == True:
-        pygame.display.update()
+                if first_move:
+                    text = ""
+                elif game.mines == flags and won == False:
+                    won = True
+                    text = f"Won: {'{:.2f}'.format(time.time() - start_time)}s"
+                elif won == True:
+                    pass
+                else:
+                    text = "Lost" if lost else ""
+                status = (text,)
+            renderer.draw(status)
     
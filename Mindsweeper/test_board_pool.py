@@ -0,0 +1,119 @@
+import json
+import time
+
+import pytest
+
+import board_pool
+from board_pool import BoardPool
+
+KEY = (8, 8, 8, (0, 0), 1, "rules")
+MINES = [(0, 4), (2, 4), (3, 2), (3, 3), (3, 4), (6, 0), (6, 5), (7, 7)]
+
+
+def key_at(start):
+    """
+    Returns the pool key of an 8x8 board with the given starting cell.
+    """
+    return (8, 8, 8, start, 1, "rules")
+
+
+def write(path, contents):
+    """
+    Writes a cache file holding the given JSON value.
+    """
+    with open(path, "w") as f:
+        json.dump(contents, f)
+
+
+def test_take_returns_board_put():
+    pool = BoardPool(path=None)
+    pool.put(KEY, MINES)
+    game = pool.take(8, 8, 8, (0, 0))
+    assert game.mines == set(MINES)
+    assert pool.take(8, 8, 8, (0, 0)) is None
+
+
+def test_take_drops_expired_boards():
+    pool = BoardPool(path=None, max_age=60)
+    pool.put(KEY, MINES, created=time.time() - 61)
+    assert pool.take(8, 8, 8, (0, 0)) is None
+    assert pool.size == 0
+
+
+def test_evicts_least_recently_used_key():
+    pool = BoardPool(path=None, max_boards=2)
+    pool.put(key_at((0, 0)), MINES)
+    pool.put(key_at((0, 1)), MINES)
+    pool.put(key_at((0, 0)), MINES)
+
+    # Using a key makes it the most recently used
+    pool.take(8, 8, 8, (0, 1))
+    pool.put(key_at((0, 1)), MINES)
+    pool.put(key_at((0, 2)), MINES)
+    assert pool.count(8, 8, 8, (0, 0)) == 0
+    assert pool.count(8, 8, 8, (0, 1)) == 1
+    assert pool.count(8, 8, 8, (0, 2)) == 1
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = tmp_path / "pool.json"
+    pool = BoardPool(path=path)
+    pool.put(KEY, MINES)
+    pool.put(key_at((0, 7)), MINES)
+    pool.save()
+
+    loaded = BoardPool(path=path)
+    assert loaded.size == 2
+    assert loaded.boards == pool.boards
+    assert loaded.take(8, 8, 8, (0, 0)).mines == set(MINES)
+
+
+def test_load_drops_expired_boards(tmp_path):
+    path = tmp_path / "pool.json"
+    pool = BoardPool(path=path)
+    pool.put(KEY, MINES, created=time.time() - 120)
+    pool.save()
+    assert BoardPool(path=path, max_age=60).size == 0
+
+
+def test_load_ignores_other_version(tmp_path, monkeypatch):
+    path = tmp_path / "pool.json"
+    pool = BoardPool(path=path)
+    pool.put(KEY, MINES)
+    pool.save()
+    monkeypatch.setattr(board_pool, "CACHE_VERSION", board_pool.CACHE_VERSION + 1)
+    assert BoardPool(path=path).size == 0
+
+
+@pytest.mark.parametrize("contents", [
+    [{"key": [8, 8, 8, [0, 0], 1, "rules"], "boards": []}],
+    {"version": board_pool.CACHE_VERSION, "entries": {}},
+    {"entries": []},
+    "pool",
+    None,
+])
+def test_load_ignores_malformed_file(tmp_path, contents):
+    path = tmp_path / "pool.json"
+    write(path, contents)
+    assert BoardPool(path=path).size == 0
+
+
+def test_load_skips_malformed_entries(tmp_path):
+    path = tmp_path / "pool.json"
+    good = {"key": [8, 8, 8, [0, 0], 1, "rules"], "boards": [[time.time(), [list(mine) for mine in MINES]]]}
+    write(path, {"version": board_pool.CACHE_VERSION, "entries": [
+        {"boards": []},
+        {"key": [8, 8, 8, [0, 1], 1], "boards": []},
+        {"key": [8, 8, 8, [0, 2], 1, "rules"], "boards": [[time.time(), [[0]]]]},
+        {"key": [8, 8, 8, [0, 3], 1, "rules"], "boards": [[time.time(), [[8, 0]]]]},
+        {"key": [8, 8, 8, [0, 4], 1, "rules"], "boards": 3},
+        {"key": [8, 8, 8, [0, 5], 1, "rules"], "boards": [[time.time(), [list(mine) for mine in MINES[:-1]]]]},
+        {"key": [8, 8, 8, [0, 6], 1, "rules"], "boards": [[time.time(), [list(mine) for mine in MINES[:-1] + MINES[:1]]]]},
+        {"key": [8, 8, 8, [2, 5], 1, "rules"], "boards": [[time.time(), [list(mine) for mine in MINES]]]},
+        {"key": [8, 8, 8, [0, 8], 1, "rules"], "boards": []},
+        "entry",
+        good
+    ]})
+    pool = BoardPool(path=path)
+    assert list(pool.boards) == [KEY]
+    assert pool.size == 1
@@ -0,0 +1,52 @@
+import board_search
+from board_search import BoardSearch, combine_stats
+
+
+def wait(search):
+    """
+    Waits for a search to post its result, and returns it.
+    """
+    search.thread.join(10)
+    return search.result()
+
+
+def test_search_starts_on_thread(monkeypatch):
+    def parallel(*args, **kwargs):
+        raise AssertionError("worker processes started")
+
+    monkeypatch.setattr(board_search, "generate_solvable_board_parallel", parallel)
+    board, stats = wait(BoardSearch(8, 8, 8, (0, 0)))
+    assert board is not None
+    assert stats["attempts"] >= 1
+
+
+def test_search_moves_to_processes_after_serial_time(monkeypatch):
+    calls = []
+
+    def parallel(height, width, mines, start, **kwargs):
+        calls.append((height, width, mines, start))
+        return "board", {"attempts": 3, "elapsed": 1.0, "moves": 7, "workers": 2}
+
+    monkeypatch.setattr(board_search, "SERIAL_SECONDS", 0)
+    monkeypatch.setattr(board_search, "generate_solvable_board_parallel", parallel)
+    board, stats = wait(BoardSearch(8, 8, 8, (0, 0)))
+    assert calls == [(8, 8, 8, (0, 0))]
+    assert board == "board"
+    assert stats["attempts"] == 3
+    assert stats["workers"] == 2
+
+
+def test_cancelled_search_posts_no_board():
+    search = BoardSearch(30, 30, 400, (15, 15))
+    search.cancel()
+    board, _ = wait(search)
+    assert board is None
+
+
+def test_combine_stats():
+    first = {"attempts": 2, "elapsed": 0.5, "moves": 4, "ai": {"observations": 3, "sentences_removed": 0}}
+    second = {"attempts": 5, "elapsed": 1.5, "moves": 6, "workers": 4, "ai": {"observations": 2}}
+    assert combine_stats(first, second) == {
+        "attempts": 7, "elapsed": 2.0, "moves": 10, "workers": 4,
+        "ai": {"observations": 5, "sentences_removed": 0}
+    }
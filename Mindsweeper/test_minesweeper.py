@@ -0,0 +1,283 @@
+import itertools
+import random
+import threading
+
+import pytest
+
+import minesweeper
+from bitboard import BitboardMinesweeper
+from minesweeper import LargeMinesweeper, Minesweeper, MinesweeperAI, play_move
+
+# Board sizes to check, including single rows, single columns and a single cell
+SIZES = [(1, 1), (1, 2), (1, 9), (9, 1), (2, 2), (3, 7), (8, 8), (16, 30)]
+
+
+def random_mines(height, width, seed):
+    """
+    Returns seeded random mine positions anywhere on a board,
+    from none up to every cell.
+    """
+    rng = random.Random(seed)
+    cells = [(i, j) for i in range(height) for j in range(width)]
+    return rng.sample(cells, rng.randint(0, len(cells)))
+
+
+def scan(mines, height, width, cell):
+    """
+    Counts the mines around a cell by looking at every cell of its 3x3 square.
+    """
+    i, j = cell
+    count = 0
+    for a in range(i - 1, i + 2):
+        for b in range(j - 1, j + 2):
+            if (a, b) != cell and 0 <= a < height and 0 <= b < width and (a, b) in mines:
+                count += 1
+    return count
+
+
+def flood(mines, height, width, cell):
+    """
+    Returns the cells revealing a cell uncovers on a fresh board: the cell
+    itself and, if it has no nearby mines, the connected area of such
+    cells together with every cell bordering it.
+    """
+    area = {cell}
+    unvisited = [cell]
+    while unvisited:
+        i, j = unvisited.pop()
+        if scan(mines, height, width, (i, j)) != 0:
+            continue
+        for a in range(i - 1, i + 2):
+            for b in range(j - 1, j + 2):
+                if 0 <= a < height and 0 <= b < width and (a, b) not in area:
+                    area.add((a, b))
+                    unvisited.append((a, b))
+    return area
+
+
+@pytest.fixture(params=["numpy", "python"])
+def counting(request, monkeypatch):
+    """
+    Runs a test once with the NumPy count and once with the fallback.
+    """
+    if request.param == "numpy":
+        if minesweeper.np is None:
+            pytest.skip("NumPy is not installed")
+    else:
+        monkeypatch.setattr(minesweeper, "np", None)
+    return request.param
+
+
+@pytest.mark.parametrize("height, width", SIZES)
+@pytest.mark.parametrize("seed", range(5))
+def test_nearby_mines_matches_scan(counting, height, width, seed):
+    mines = set(random_mines(height, width, seed))
+    game = Minesweeper(height, width, mine_positions=mines)
+    for i in range(height):
+        for j in range(width):
+            assert game.nearby_mines((i, j)) == scan(mines, height, width, (i, j))
+
+
+@pytest.mark.parametrize("game_class", [LargeMinesweeper, BitboardMinesweeper])
+@pytest.mark.parametrize("height, width", SIZES)
+@pytest.mark.parametrize("seed", range(5))
+def test_other_boards_match_scan(game_class, height, width, seed):
+    mines = set(random_mines(height, width, seed))
+    game = game_class(height, width, mine_positions=mines)
+    for i in range(height):
+        for j in range(width):
+            assert game.nearby_mines((i, j)) == scan(mines, height, width, (i, j))
+
+
+@pytest.mark.parametrize("game_class", [Minesweeper, LargeMinesweeper, BitboardMinesweeper])
+@pytest.mark.parametrize("height, width", SIZES)
+@pytest.mark.parametrize("seed", range(5))
+def test_reveal_counts_match_scan(counting, game_class, height, width, seed):
+    rng = random.Random(seed)
+    mines = set(random_mines(height, width, seed))
+    game = game_class(height, width, mine_positions=mines)
+    safe = [(i, j) for i in range(height) for j in range(width) if (i, j) not in mines]
+    revealed = set()
+    for cell in rng.sample(safe, min(len(safe), 5)):
+        uncovered = game.reveal(cell, revealed)
+        assert uncovered.keys() == {cell} | (flood(mines, height, width, cell) - revealed)
+        for square, count in uncovered.items():
+            assert square not in mines
+            assert count == scan(mines, height, width, square)
+        revealed.update(uncovered)
+
+
+@pytest.mark.parametrize("game_class", [Minesweeper, LargeMinesweeper, BitboardMinesweeper])
+@pytest.mark.parametrize("seed", range(20))
+def test_reveal_same_area_twice(game_class, seed):
+    rng = random.Random(seed)
+    mines = set(rng.sample([(i, j) for i in range(12) for j in range(12)], 15))
+    game = game_class(12, 12, mine_positions=mines)
+    empty = [(i, j) for i in range(12) for j in range(12) if (i, j) not in mines and scan(mines, 12, 12, (i, j)) == 0]
+    for cell in empty[:3]:
+        area = flood(mines, 12, 12, cell)
+        other = rng.choice(sorted(square for square in area if square in empty))
+
+        # Revealing another empty cell of the area, with nothing revealed,
+        # uncovers the whole area again, and with the area revealed only itself
+        assert game.reveal(cell).keys() == area
+        assert game.reveal(other).keys() == area
+        assert game.reveal(other, area).keys() == {other}
+
+
+@pytest.mark.parametrize("search", [minesweeper.generate_solvable_board, minesweeper.generate_solvable_board_parallel])
+def test_bitboard_search_rejects_ai_stats(search):
+    with pytest.raises(ValueError):
+        search(8, 8, 8, (0, 0), bitboard=True, ai_stats=True)
+
+
+def stuck_game(seed, **options):
+    """
+    Returns a seeded 5x5 game, an AI with the given options that has
+    played it from a corner until its rules found no safe move, having
+    been shown up to two safe cells along the way, and the revealed cells.
+    """
+    rng = random.Random(seed)
+    game = Minesweeper(5, 5, 5, starting_position=(0, 0), rng=rng)
+    ai = MinesweeperAI(5, 5, **options)
+    revealed = set()
+    move = (0, 0)
+    for _ in range(rng.randint(0, 2) + 1):
+        while move is not None:
+            play_move(game, ai, move, revealed)
+            move = ai.make_safe_move()
+        hidden = sorted((i, j) for i in range(5) for j in range(5) if (i, j) not in revealed and (i, j) not in game.mines)
+        if not hidden:
+            break
+        move = rng.choice(hidden)
+    return game, ai, revealed
+
+
+def placements(game, revealed, cells, mines=None):
+    """
+    Returns every set of cells, of the given number of mines if any,
+    that could be the mines among `cells` given the revealed counts.
+    """
+    checks = [
+        ({neighbor for neighbor in game.neighbors[cell] if neighbor in cells}, game.nearby_mines(cell))
+        for cell in revealed
+    ]
+    sizes = [mines] if mines is not None else range(len(cells) + 1)
+    return [
+        set(placement)
+        for size in sizes
+        for placement in itertools.combinations(sorted(cells), size)
+        if all(len(around.intersection(placement)) == count for around, count in checks)
+    ]
+
+
+def frontier(game, revealed):
+    """
+    Returns the hidden cells next to a revealed cell.
+    """
+    return {neighbor for cell in revealed for neighbor in game.neighbors[cell] if neighbor not in revealed}
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_mine_probabilities_match_enumeration(seed):
+    game, ai, revealed = stuck_game(seed, total_mines=5)
+    hidden = {(i, j) for i in range(5) for j in range(5)} - revealed
+    every = placements(game, revealed, hidden, mines=5)
+    probabilities = ai.mine_probabilities()
+    assert probabilities.keys() == hidden - ai.mines
+    for cell in hidden:
+        expected = sum(cell in placement for placement in every) / len(every)
+        if cell in ai.mines:
+            assert expected == 1
+        else:
+            assert probabilities[cell] == pytest.approx(expected, abs=1e-9)
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_search_components_marks_forced_cells(seed):
+    game, ai, revealed = stuck_game(seed)
+    cells = frontier(game, revealed)
+    every = placements(game, revealed, cells)
+    ai.search_components()
+    assert ai.mines == {cell for cell in cells if all(cell in placement for placement in every)}
+    assert ai.safes - revealed == {cell for cell in cells if not any(cell in placement for placement in every)}
+
+
+@pytest.mark.parametrize("difficulty", [1, 3])
+@pytest.mark.parametrize("seed", range(30))
+def test_search_linear_marks_only_forced_cells(seed, difficulty):
+    game, ai, revealed = stuck_game(seed, difficulty=difficulty)
+    cells = frontier(game, revealed)
+    every = placements(game, revealed, cells)
+    ai.search_linear()
+    assert ai.mines <= game.mines
+    assert not ai.safes & game.mines
+    assert all(ai.mines <= placement and not ai.safes & placement for placement in every)
+
+
+def test_row_reduce_keeps_solutions():
+    rng = random.Random(0)
+    variables = "abcdef"
+    for _ in range(50):
+        values = {variable: rng.randint(0, 1) for variable in variables}
+        rows = []
+        for _ in range(rng.randint(1, 5)):
+            coefficients = {variable: 1 for variable in rng.sample(variables, rng.randint(1, 4))}
+            rows.append((coefficients, sum(values[variable] for variable in coefficients)))
+        reduced = minesweeper.row_reduce(rows)
+        assert len(reduced) <= len(rows)
+        for coefficients, total in reduced:
+            assert sum(a * values[variable] for variable, a in coefficients.items()) == total
+
+        # Each variable leads at most one reduced equation
+        leads = [min(coefficients) for coefficients, _ in reduced]
+        assert len(leads) == len(set(leads))
+
+
+def test_sentence_equality():
+    sentence = minesweeper.Sentence({(0, 0), (0, 1)}, 1)
+    assert sentence == minesweeper.Sentence([(0, 1), (0, 0)], 1)
+    assert sentence != minesweeper.Sentence({(0, 0), (0, 1)}, 2)
+    assert sentence != "sentence"
+    assert sentence not in [None, 1]
+
+
+def test_component_stops_once_cancelled():
+    cancel = threading.Event()
+    sentences = [minesweeper.Sentence({(0, 0), (0, 1)}, 1), minesweeper.Sentence({(0, 1), (0, 2)}, 2)]
+    assert minesweeper.Component(sentences, cancel).forced() == ([(0, 1), (0, 2)], [(0, 0)])
+    assert minesweeper.Component(sentences, cancel).count() is not None
+    cancel.set()
+    assert minesweeper.Component(sentences, cancel).forced() == ([], [])
+    assert minesweeper.Component(sentences, cancel).count() is None
+
+
+def test_parallel_search_rejects_unsupported_solver():
+    with pytest.raises(ValueError):
+        minesweeper.generate_solvable_board_parallel(8, 8, 8, (0, 0), bitboard=True, solver="csp", workers=2)
+
+
+def test_parallel_search_raises_worker_error():
+    # More mines than cells away from the start cannot be placed
+    with pytest.raises(ValueError):
+        minesweeper.generate_solvable_board_parallel(3, 3, 6, (0, 0), workers=2)
+
+
+@pytest.mark.parametrize("difficulty, solver", [(1, "rules"), (3, "linear"), (3, "csp")])
+@pytest.mark.parametrize("seed", range(10))
+def test_unconstrained_cells_kept_up_to_date(seed, difficulty, solver):
+    random.seed(seed)
+    game = Minesweeper(9, 9, 12, starting_position=(4, 4), rng=random.Random(seed))
+    ai = MinesweeperAI(9, 9, difficulty=difficulty, solver=solver, guess="probability", total_mines=12)
+    revealed = set()
+    move = (4, 4)
+    while move is not None and not game.is_mine(move):
+        play_move(game, ai, move, revealed)
+        assert ai.unconstrained_cells() == [
+            (i, j) for i in range(9) for j in range(9)
+            if (i, j) not in ai.moves_made and (i, j) not in ai.mines
+            and (i, j) not in ai.safes and not ai.index.get((i, j))
+        ]
+        assert ai.unconstrained() == len(ai.unconstrained_cells())
+        move = ai.make_safe_move() or ai.make_random_move()
+        assert move is None or (move not in ai.moves_made and move not in ai.mines)
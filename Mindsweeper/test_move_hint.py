@@ -0,0 +1,53 @@
+import random
+import threading
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI, play_move
+from move_hint import MoveHint
+
+
+def stuck_ai(seed):
+    """
+    Returns an AI that guesses by probability, having played a seeded
+    board until it found no safe move, or None if it cleared the board.
+    """
+    game = Minesweeper(9, 9, 12, starting_position=(4, 4), rng=random.Random(seed))
+    ai = MinesweeperAI(9, 9, difficulty=3, solver="csp", guess="probability", total_mines=12)
+    revealed = set()
+    move = (4, 4)
+    while move is not None:
+        play_move(game, ai, move, revealed)
+        move = ai.make_safe_move()
+    return ai if ai.knowledge else None
+
+
+def wait_ready(hint, ai):
+    """
+    Waits for the hint to have a move ready for the AI, and returns it.
+    """
+    for _ in range(1000):
+        taken = hint.take(ai)
+        if taken is not None:
+            return taken
+        time.sleep(0.01)
+    raise AssertionError("no move worked out")
+
+
+def test_hint_hands_back_component_counts():
+    ai = next(ai for ai in map(stuck_ai, range(50)) if ai is not None)
+    assert ai.component_counts == {}
+    hint = MoveHint()
+    hint.request(ai)
+    move, snapshot = wait_ready(hint, ai)
+    assert ai.component_counts
+    assert ai.component_counts == snapshot.component_counts
+    assert move not in ai.moves_made
+
+
+def test_cancelled_search_linear_marks_nothing():
+    ai = next(ai for ai in map(stuck_ai, range(50)) if ai is not None)
+    ai.cancel = threading.Event()
+    ai.cancel.set()
+    mines, safes = set(ai.mines), set(ai.safes)
+    assert not ai.search_linear()
+    assert ai.mines == mines and ai.safes == safes